@@ -1,6 +1,32 @@
 import sqlite3
 import functools
 import csv
+import hashlib
+import importlib.util
+import os
+import sys
+import time
+
+GENERATORS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'python-generators-0x00')
+
+
+def load_generators_module(name):
+    """
+    Imports one stdlib-only helper module from python-generators-0x00 by
+    path, without putting that directory (seed, backends, ...) on sys.path.
+    It is registered in sys.modules so pool workers can unpickle its functions.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.spec_from_file_location(name, os.path.join(GENERATORS_DIR, f"{name}.py"))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+LoadProgress = load_generators_module('load_progress').LoadProgress
+parallel_csv_rows = load_generators_module('parallel_csv').parallel_csv_rows
 
 # -------------------------
 # Decorator for handling connections safely
@@ -50,52 +76,231 @@ def create_table(conn):
 # -------------------------
 # Generator to stream rows from CSV file
 # -------------------------
-def stream_csv_rows(csv_file):
-    """Yields rows from CSV one by one as tuples."""
+def parse_user_row(row):
+    """Turns a CSV row into a (name, email, age) tuple, or None if incomplete."""
+    if not all([row.get('name'), row.get('email'), row.get('age')]):
+        return None
+    return (row['name'], row['email'], int(row['age']))
+
+
+# Rows between updates of LoadProgress.bytes; tell() per row is measurable
+PROGRESS_EVERY_ROWS = 1000
+
+
+def stream_csv_rows(csv_file, progress=None):
+    """Yields rows from CSV one by one as tuples.
+
+    A LoadProgress passed as progress is told about rejected rows and, every
+    PROGRESS_EVERY_ROWS rows, how far into the file the reader is.
+    """
     try:
         with open(csv_file, newline='', encoding='utf-8') as f:
             reader = csv.DictReader(f)
-            for row in reader:
+            for i, row in enumerate(reader, 1):
+                parsed = parse_user_row(row)
+                if progress is not None and i % PROGRESS_EVERY_ROWS == 0:
+                    progress.bytes = f.buffer.tell()
                 # Skip incomplete rows
-                if not all([row.get('name'), row.get('email'), row.get('age')]):
+                if parsed is None:
+                    if progress is not None:
+                        progress.rejected += 1
                     continue
-                yield (row['name'], row['email'], int(row['age']))
+                yield parsed
+            if progress is not None:
+                progress.bytes = f.buffer.tell()
     except FileNotFoundError:
         print(f"❌ File '{csv_file}' not found.")
     except KeyError as e:
         print(f"❌ Missing column in CSV: {e}")
 
 
+def stream_csv_rows_parallel(csv_file, workers=None, ordered=True, progress=None):
+    """Same rows as stream_csv_rows, parsed by a pool of worker processes."""
+    stats = {}
+    try:
+        for row in parallel_csv_rows(csv_file, parse_user_row, workers, ordered, stats=stats):
+            if progress is not None:
+                progress.bytes = stats["bytes"]
+                progress.rejected = stats["rejected"]
+            yield row
+    except FileNotFoundError:
+        print(f"❌ File '{csv_file}' not found.")
+    except KeyError as e:
+        print(f"❌ Missing column in CSV: {e}")
+
+
+# -------------------------
+# Bulk-load settings
+# -------------------------
+# Per-connection pragmas for bulk mode. with_connection opens a fresh
+# connection per call, so they only last for that load. A crash mid-load
+# with the journal in memory can corrupt the file: keep a copy if it matters.
+BULK_LOAD_PRAGMAS = {
+    "journal_mode": "MEMORY",
+    "synchronous": "OFF",
+    "cache_size": -262144,  # negative = KiB, i.e. 256 MB
+    "temp_store": "MEMORY",
+}
+
+
+def apply_pragmas(conn, pragmas):
+    for name, value in pragmas.items():
+        conn.execute(f"PRAGMA {name} = {value}")
+
+
+# -------------------------
+# Incremental upsert keyed on email
+# -------------------------
+def content_hash(name, age):
+    """Fingerprint of the non-key columns; unchanged rows hash the same."""
+    return hashlib.blake2b(f"{name}\x1f{age}".encode('utf-8'), digest_size=16).hexdigest()
+
+
+def prepare_upsert(conn):
+    """Adds users.content_hash if missing and creates the per-batch staging table."""
+    columns = [c[1] for c in conn.execute("PRAGMA table_info(users)")]
+    if "content_hash" not in columns:
+        conn.execute("ALTER TABLE users ADD COLUMN content_hash TEXT")
+    conn.execute("""
+        CREATE TEMP TABLE IF NOT EXISTS users_delta (
+            email TEXT PRIMARY KEY,
+            name TEXT,
+            age INTEGER,
+            content_hash TEXT
+        )
+    """)
+
+
+def upsert_batch(cursor, batch):
+    """
+    Applies one batch keyed on email; returns (inserted, updated, unchanged).
+    Rows whose content hash matches the stored one are not written at all.
+    If an email repeats within the batch the last row wins.
+    """
+    cursor.execute("DELETE FROM users_delta")
+    cursor.executemany(
+        "INSERT OR REPLACE INTO users_delta (email, name, age, content_hash) VALUES (?, ?, ?, ?)",
+        [(email, name, age, content_hash(name, age)) for name, email, age in batch],
+    )
+    staged = cursor.execute("SELECT COUNT(*) FROM users_delta").fetchone()[0]
+
+    # Driven by the email index; an UPDATE ... FROM join would scan all of users
+    cursor.execute("""
+        UPDATE users
+        SET (name, age, content_hash) = (
+            SELECT d.name, d.age, d.content_hash FROM users_delta AS d
+            WHERE d.email = users.email
+        )
+        WHERE email IN (SELECT email FROM users_delta)
+          AND content_hash IS NOT (
+            SELECT d.content_hash FROM users_delta AS d WHERE d.email = users.email
+          )
+    """)
+    updated = cursor.rowcount
+    cursor.execute("""
+        INSERT INTO users (name, email, age, content_hash)
+        SELECT d.name, d.email, d.age, d.content_hash FROM users_delta AS d
+        WHERE NOT EXISTS (SELECT 1 FROM users AS u WHERE u.email = d.email)
+    """)
+    inserted = cursor.rowcount
+    return inserted, updated, staged - inserted - updated
+
+
 # -------------------------
 # Insert generator data in batches
 # -------------------------
 @with_connection
-def insert_from_generator(conn, csv_file, batch_size=500):
+def insert_from_generator(conn, csv_file, batch_size=500, workers=0, ordered=True,
+                          bulk=False, defer_index=False, upsert=False, progress=None):
+    """
+    bulk=True applies BULK_LOAD_PRAGMAS and loads in one explicit transaction.
+    defer_index=True stages rows in an unindexed temp table and merges them
+    into users sorted by email, so the UNIQUE email index is built in one
+    ordered pass instead of being updated at random for every row.
+    upsert=True updates existing emails whose name/age changed instead of
+    ignoring them (see upsert_batch).
+    progress is a LoadProgress; by default one is created that prints a
+    status line every 10 seconds.
+    Returns a dict of inserted/updated/unchanged counts.
+    """
+    if upsert and defer_index:
+        raise ValueError("defer_index cannot be combined with upsert")
     cursor = conn.cursor()
     batch = []
-    total_inserted = 0
+    counts = {"inserted": 0, "updated": 0, "unchanged": 0}
+    if progress is None:
+        total = os.path.getsize(csv_file) if os.path.exists(csv_file) else None
+        progress = LoadProgress(total_bytes=total)
 
-    for row in stream_csv_rows(csv_file):
+    if bulk:
+        apply_pragmas(conn, BULK_LOAD_PRAGMAS)
+        cursor.execute("BEGIN")
+    if upsert:
+        prepare_upsert(conn)
+    elif defer_index:
+        cursor.execute("CREATE TEMP TABLE users_load (name TEXT, email TEXT, age INTEGER)")
+        insert_query = "INSERT INTO users_load (name, email, age) VALUES (?, ?, ?)"
+    else:
+        insert_query = "INSERT OR IGNORE INTO users (name, email, age) VALUES (?, ?, ?)"
+
+    def write(batch):
+        start = time.perf_counter()
+        write_batch(batch)
+        progress.add_batch(len(batch), time.perf_counter() - start)
+
+    def write_batch(batch):
+        if upsert:
+            inserted, updated, unchanged = upsert_batch(cursor, batch)
+            counts["inserted"] += inserted
+            counts["updated"] += updated
+            counts["unchanged"] += unchanged
+            return
+        # total_changes counts exactly the rows written; ignored duplicates add nothing
+        before = conn.total_changes
+        cursor.executemany(insert_query, batch)
+        if not defer_index:
+            inserted = conn.total_changes - before
+            counts["inserted"] += inserted
+            counts["unchanged"] += len(batch) - inserted
+
+    # workers > 0 parses the CSV on that many processes; inserts stay on this connection
+    if workers:
+        rows = stream_csv_rows_parallel(csv_file, workers, ordered, progress)
+    else:
+        rows = stream_csv_rows(csv_file, progress)
+    for row in rows:
         batch.append(row)
 
         # Once batch is full, insert it
         if len(batch) == batch_size:
-            cursor.executemany("""
-                INSERT OR IGNORE INTO users (name, email, age)
-                VALUES (?, ?, ?)
-            """, batch)
-            total_inserted += cursor.rowcount
+            write(batch)
             batch.clear()  # clear the list to reuse memory
 
     # Insert remaining rows (if any)
     if batch:
-        cursor.executemany("""
+        write(batch)
+
+    if defer_index:
+        # rowid breaks email ties so the first occurrence in the CSV wins
+        staged = cursor.execute("SELECT COUNT(*) FROM users_load").fetchone()[0]
+        before = conn.total_changes
+        cursor.execute("""
             INSERT OR IGNORE INTO users (name, email, age)
-            VALUES (?, ?, ?)
-        """, batch)
-        total_inserted += cursor.rowcount
+            SELECT name, email, age FROM users_load ORDER BY email, rowid
+        """)
+        counts["inserted"] = conn.total_changes - before
+        counts["unchanged"] = staged - counts["inserted"]
+        cursor.execute("DROP TABLE users_load")
+
+    progress.finish()
 
-    print(f"✅ Inserted {total_inserted} records from {csv_file} in batches of {batch_size}.")
+    if upsert:
+        print(f"✅ Upserted {csv_file}: {counts['inserted']} inserted, "
+              f"{counts['updated']} updated, {counts['unchanged']} unchanged.")
+    else:
+        print(f"✅ Inserted {counts['inserted']} records from {csv_file} in batches of {batch_size} "
+              f"({counts['unchanged']} already present).")
+    return counts
 
 
 # -------------------------
@@ -103,7 +308,12 @@ def insert_from_generator(conn, csv_file, batch_size=500):
 # -------------------------
 def main():
     create_table()
-    insert_from_generator("python-generators-0x00/user_data.csv", batch_size=500)
+    # python3 insert_data.py --bulk: tuned pragmas, index built after the load
+    # python3 insert_data.py --upsert: update changed rows, skip unchanged ones
+    bulk = "--bulk" in sys.argv[1:]
+    upsert = "--upsert" in sys.argv[1:]
+    insert_from_generator("python-generators-0x00/user_data.csv", batch_size=500,
+                          bulk=bulk, defer_index=bulk and not upsert, upsert=upsert)
 
 
 if __name__ == "__main__":
@@ -1,17 +1,60 @@
 import sqlite3
 import functools
+import inspect
+import sys
 import time
-from datetime import datetime
+from query_log import get_query_logger
 ##decorator function to log queries 
-def log_queries(func):
-    @functools.wraps(func)
-    def wrapper(*args,**kwargs):
-        q=kwargs.get('qeury') if 'query' in kwargs else (args[0] if len(args)>0 else None)
-        #printing the query to the screen
-        print(f"[LOG]: {datetime.now()}: Function {func.__name__} executing SQL: {q}")
-        #calling the original function
-        return func(*args,**kwargs)
-    return wrapper
+def log_queries(func=None,*,sample_rate=None,logger=None):
+    """Logs each query with its duration and row count (see query_log.QueryLogger).
+
+    Use as @log_queries or @log_queries(sample_rate=0.1, logger=...). Parameters
+    are only logged as a fingerprint. Every call is also counted in the
+    per-query latency histograms: get_query_logger().histograms.dump().
+    """
+    def decorator(func):
+        def extract(args,kwargs):
+            q=kwargs.get('query') if 'query' in kwargs else (args[0] if len(args)>0 else None)
+            params=kwargs.get('params') if 'params' in kwargs else (args[1] if len(args)>1 else ())
+            return q,params
+
+        def record(*args,**kwargs):
+            #a logging failure must never change the decorated function's outcome
+            try:
+                (logger or get_query_logger()).record(func.__name__,*args,sample_rate=sample_rate,**kwargs)
+            except Exception as e:
+                print(f"[LOG]: could not log query for {func.__name__}: {e!r}",file=sys.stderr)
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args,**kwargs):
+                q,params=extract(args,kwargs)
+                start=time.perf_counter()
+                try:
+                    result=await func(*args,**kwargs)
+                except Exception as e:
+                    record(q,params,time.perf_counter()-start,error=e)
+                    raise
+                record(q,params,time.perf_counter()-start,result)
+                return result
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args,**kwargs):
+            q,params=extract(args,kwargs)
+            #timing the original function; the log write happens on the listener thread
+            start=time.perf_counter()
+            try:
+                result=func(*args,**kwargs)
+            except Exception as e:
+                record(q,params,time.perf_counter()-start,error=e)
+                raise
+            record(q,params,time.perf_counter()-start,result)
+            return result
+        return wrapper
+    if func is not None:
+        return decorator(func)
+    return decorator
 
 @log_queries
 def fetch_all_users(query):
@@ -1,35 +1,43 @@
-import sqlite3 
 import functools
-
-def with_db_connection(db_name='users.db'):
-    def decorator(func):
-        @functools.wraps(func)
-        def wrapper(*args,**kwargs):
-            conn=sqlite3.connect(db_name)
-            try:
-                return func(conn,*args,**kwargs)
-            except Exception as e:
-                print(f"Error executing query: {e}")
-            finally:
-                conn.close()
-        return wrapper
-    return decorator
+import inspect
+from connection_pool import with_db_connection
+from result_cache import WRITE_ACTIONS, invalidate_tables, track_tables, track_tables_async
 
 def transactional(func):
     """
     Decorator to automatically handle COMMIT and ROLLBACK
-    for database transactions.
+    for database transactions. After a commit, cache_query results
+    that read any table the transaction wrote are invalidated.
+    Works on async def functions too (with an aiosqlite connection).
     """
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(conn, *args, **kwargs):
+            try:
+                async with track_tables_async(conn, WRITE_ACTIONS) as written:
+                    result = await func(conn, *args, **kwargs)
+                await conn.commit()
+            except Exception as e:
+                await conn.rollback()
+                print(f"Transaction failed: {e}")
+                raise
+            invalidate_tables(written)
+            return result
+        return async_wrapper
+
     @functools.wraps(func)
     def wrapper(conn, *args, **kwargs):
         try:
-            result = func(conn, *args, **kwargs)
+            with track_tables(conn, WRITE_ACTIONS) as written:
+                result = func(conn, *args, **kwargs)
             conn.commit()  # ✅ Save changes if everything worked
-            return result
         except Exception as e:
             conn.rollback()  # ❌ Undo changes if there was an error
             print(f"Transaction failed: {e}")
             raise  # Re-raise the error for debugging/logging
+        # 🧹 Drop cached reads of the tables this transaction changed
+        invalidate_tables(written)
+        return result
     return wrapper
 
 
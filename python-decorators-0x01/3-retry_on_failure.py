@@ -1,24 +1,29 @@
+import asyncio
 import time 
-import sqlite3
 import functools
-
-def with_db_connection(db_name='users.db'):
-    def decorator(func):
-        @functools.wraps(func)
-        def wrapper(*args,**kwargs):
-            conn=sqlite3.connect(db_name)
-            try:
-                return func(conn,*args,**kwargs)
-            except Exception as e:
-                print(f"Error executing query: {e}")
-            finally:
-                conn.close()
-        return wrapper
-    return decorator
+import inspect
+from connection_pool import with_db_connection
 
 #creating the function that makes the retry
 def retry_on_failure(retries=3, delay=2):
     def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            #async version waits with asyncio.sleep so the event loop keeps running
+            @functools.wraps(func)
+            async def async_wrapper(conn, *args, **kwargs):
+                for attempt in range(1, retries + 1):
+                    try:
+                        return await func(conn, *args, **kwargs)
+                    except Exception as e:
+                        print(f"Attempt {attempt} failed: {e}")
+                        if attempt == retries:
+                            print("All retry attempts failed. Raising exception.")
+                            raise
+                        else:
+                            print(f"Retrying in {delay} seconds...")
+                            await asyncio.sleep(delay)
+            return async_wrapper
+
         @functools.wraps(func)
         def wrapper(conn, *args, **kwargs):
             for attempt in range(1, retries + 1):
@@ -1,55 +1,102 @@
-import time
-import sqlite3
+import asyncio
 import functools
+import inspect
+from connection_pool import with_db_connection
+from result_cache import READ_ACTIONS, ResultCache, params_key, track_tables, track_tables_async
 
-query_cache={}
+def _cache_key(args, kwargs):
+    """Returns (query, params, cache key) for a cache_query call."""
+    # Extract SQL query and parameters
+    q = kwargs.get('query') or (args[0] if args else None)
+    params = kwargs.get('params') or (args[1] if len(args) > 1 else ())
 
-def with_db_connection(db_name='users.db'):
+    if not q:
+        raise ValueError("No SQL query provided for caching.")
+
+    # Create a cache key; named and scalar params keep their values in it
+    return q, params, (q, params_key(params))
+
+def cache_query(func=None, *, max_entries=128, max_bytes=None, ttl=None):
+    """Caches SQL query results safely, handles all errors gracefully.
+
+    Use as @cache_query or @cache_query(max_entries=..., max_bytes=..., ttl=...).
+    Each decorated function gets its own bounded LRU cache (see ResultCache),
+    reachable as func.cache, e.g. func.cache.stats() for hit/miss counters.
+    Entries remember the tables their query read, so a commit through
+    transactional drops only the results that the write made stale.
+    On async def functions, concurrent misses for the same query share
+    one execution instead of all hitting the database.
+    """
     def decorator(func):
+        cache=ResultCache(max_entries=max_entries,max_bytes=max_bytes,ttl=ttl)
+
+        if inspect.iscoroutinefunction(func):
+            inflight={}  # cache_key -> future of the query already running for it
+
+            @functools.wraps(func)
+            async def async_wrapper(conn, *args, **kwargs):
+                q, params, cache_key = _cache_key(args, kwargs)
+
+                hit, results = cache.get(cache_key)
+                if hit:
+                    print(f"✅ In cache {cache_key}")
+                    return results
+
+                # Concurrent misses for the same query wait for one execution
+                pending = inflight.get(cache_key)
+                if pending is not None:
+                    return await asyncio.shield(pending)
+                future = asyncio.get_running_loop().create_future()
+                inflight[cache_key] = future
+                try:
+                    print(f"🔍 Executing query: {q} with params: {params}")
+                    generation = cache.generation
+                    async with track_tables_async(conn, READ_ACTIONS) as tables:
+                        results = await func(conn, *args, **kwargs)
+                    if cache.set(cache_key, results, tables, generation):
+                        print(f"💾 Cached result for {cache_key}")
+                except Exception as e:
+                    print(f"⚠️ Error while executing query: {e}")
+                    results = None
+                except BaseException:
+                    future.cancel()  # we were cancelled; so are the waiters
+                    raise
+                finally:
+                    del inflight[cache_key]
+                future.set_result(results)
+                return results
+            async_wrapper.cache=cache
+            return async_wrapper
+
         @functools.wraps(func)
-        def wrapper(*args,**kwargs):
-            conn=sqlite3.connect(db_name)
+        def wrapper(conn, *args, **kwargs):
+            q, params, cache_key = _cache_key(args, kwargs)
+
+            # If the query is cached and still fresh, return it
+            hit, results = cache.get(cache_key)
+            if hit:
+                print(f"✅ In cache {cache_key}")
+                return results
+
+            # If not cached, execute and cache it, noting the tables it reads
             try:
-                return func(conn,*args,**kwargs)
+                print(f"🔍 Executing query: {q} with params: {params}")
+                generation = cache.generation
+                with track_tables(conn, READ_ACTIONS) as tables:
+                    results = func(conn, *args, **kwargs)
+                if cache.set(cache_key, results, tables, generation):
+                    print(f"💾 Cached result for {cache_key}")
+                return results
+
             except Exception as e:
-                print(f"Error executing query: {e}")
-            finally:
-                conn.close()
+                print(f"⚠️ Error while executing query: {e}")
+                return None
+        wrapper.cache=cache
         return wrapper
+    if func is not None:
+        return decorator(func)
     return decorator
 
-def cache_query(func):
-    """Caches SQL query results safely, handles all errors gracefully."""
-    @functools.wraps(func)
-    def wrapper(conn, *args, **kwargs):
-        # Extract SQL query and parameters
-        q = kwargs.get('query') or (args[0] if args else None)
-        params = kwargs.get('params') or (args[1] if len(args) > 1 else ())
-
-        if not q:
-            raise ValueError("No SQL query provided for caching.")
-
-        # Create a cache key
-        cache_key = (q, tuple(params))
-
-        # If the query is already cached, return it
-        if cache_key in query_cache:
-            print(f"✅ In cache {cache_key}")
-            return query_cache[cache_key]
-
-        # If not cached, execute and cache it
-        try:
-            print(f"🔍 Executing query: {q} with params: {params}")
-            results = func(conn, *args, **kwargs)
-            query_cache[cache_key] = results
-            print(f"💾 Cached result for {cache_key}")
-            return results
-
-        except Exception as e:
-            print(f"⚠️ Error while executing query: {e}")
-            return None
-    return wrapper
-
 @with_db_connection()
 @cache_query
 def fetch_users_with_cache(conn,query,params=None):
@@ -0,0 +1,265 @@
+import asyncio
+import functools
+import inspect
+import sqlite3
+import threading
+import time
+
+import aiosqlite
+
+
+class SQLitePool:
+    """
+    Thread-safe pool of sqlite3 connections to one database file.
+
+    A thread that already holds a connection gets the same one back, so
+    nested decorated calls share it. Otherwise an idle connection is reused
+    or, below max_size, a new one is opened; at max_size callers wait up to
+    `timeout` seconds. Connections older than max_age seconds are closed
+    when returned instead of going back to the pool.
+    """
+
+    def __init__(self, db_name, max_size=5, max_age=300.0, timeout=None):
+        self.db_name = db_name
+        self.max_size = max_size
+        self.max_age = max_age
+        self.timeout = timeout
+        self.idle = []  # [(conn, opened_at)], most recently returned last
+        self.opened = {}  # id(conn) -> opened_at, for every open connection
+        self.local = threading.local()
+        self.cond = threading.Condition()
+        self.closed = False
+
+    def _open(self):
+        # Borrowed by one thread at a time, but not always the one that opened it
+        conn = sqlite3.connect(self.db_name, check_same_thread=False)
+        self.opened[id(conn)] = time.monotonic()
+        return conn
+
+    def acquire(self):
+        held = getattr(self.local, "conn", None)
+        if held is not None:
+            self.local.depth += 1
+            return held
+        with self.cond:
+            deadline = None if self.timeout is None else time.monotonic() + self.timeout
+            while not self.idle and len(self.opened) >= self.max_size:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError(f"No free connection to {self.db_name}")
+                self.cond.wait(remaining)
+            conn = None
+            while self.idle and conn is None:
+                conn, opened_at = self.idle.pop()
+                if time.monotonic() - opened_at >= self.max_age:
+                    self._discard(conn)
+                    conn = None
+            if conn is None:
+                conn = self._open()
+        self.local.conn = conn
+        self.local.depth = 1
+        return conn
+
+    def release(self, conn):
+        self.local.depth -= 1
+        if self.local.depth:
+            return
+        self.local.conn = None
+        if conn.in_transaction:
+            conn.rollback()  # same as closing: uncommitted work is discarded
+        with self.cond:
+            opened_at = self.opened[id(conn)]
+            if self.closed or time.monotonic() - opened_at >= self.max_age:
+                self._discard(conn)
+            else:
+                self.idle.append((conn, opened_at))
+            self.cond.notify()
+
+    def _discard(self, conn):
+        del self.opened[id(conn)]
+        conn.close()
+
+    def close(self):
+        """Closes the idle connections; borrowed ones close when returned."""
+        with self.cond:
+            self.closed = True
+            for conn, _ in self.idle:
+                self._discard(conn)
+            self.idle.clear()
+
+
+class AsyncSQLitePool:
+    """
+    SQLitePool for coroutines: pools aiosqlite connections to one database
+    file. A task that already holds a connection gets the same one back;
+    other tasks wait (without blocking the loop) once max_size are open.
+    """
+
+    def __init__(self, db_name, max_size=5, max_age=300.0):
+        self.db_name = db_name
+        self.max_size = max_size
+        self.max_age = max_age
+        self.idle = []
+        self.opened = {}
+        self.held = {}  # task -> [conn, depth]
+        self.cond = asyncio.Condition()
+        self.closed = False
+
+    async def acquire(self):
+        task = asyncio.current_task()
+        held = self.held.get(task)
+        if held is not None:
+            held[1] += 1
+            return held[0]
+        async with self.cond:
+            while not self.idle and len(self.opened) >= self.max_size:
+                await self.cond.wait()
+            conn = None
+            while self.idle and conn is None:
+                conn, opened_at = self.idle.pop()
+                if time.monotonic() - opened_at >= self.max_age:
+                    await self._discard(conn)
+                    conn = None
+            if conn is None:
+                conn = aiosqlite.connect(self.db_name)
+                # An idle pooled connection must not keep the process alive. In
+                # aiosqlite 0.21.0 (pinned in requirements.txt) a Connection is a
+                # not-yet-started Thread, so it can be made a daemon here.
+                if not isinstance(conn, threading.Thread):
+                    raise RuntimeError(
+                        "AsyncSQLitePool relies on aiosqlite.Connection being a Thread "
+                        "(written against aiosqlite 0.21.0); the installed aiosqlite differs"
+                    )
+                conn.daemon = True
+                await conn
+                self.opened[id(conn)] = time.monotonic()
+        self.held[task] = [conn, 1]
+        return conn
+
+    async def release(self, conn):
+        task = asyncio.current_task()
+        held = self.held[task]
+        held[1] -= 1
+        if held[1]:
+            return
+        del self.held[task]
+        if conn.in_transaction:
+            await conn.rollback()
+        async with self.cond:
+            opened_at = self.opened[id(conn)]
+            if self.closed or time.monotonic() - opened_at >= self.max_age:
+                await self._discard(conn)
+            else:
+                self.idle.append((conn, opened_at))
+            self.cond.notify()
+
+    async def _discard(self, conn):
+        del self.opened[id(conn)]
+        await conn.close()
+
+    async def close(self):
+        async with self.cond:
+            self.closed = True
+            for conn, _ in self.idle:
+                await self._discard(conn)
+            self.idle.clear()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+# event loop -> ({db_name: AsyncSQLitePool}, shutdown guard); aiosqlite
+# connections belong to one loop. A plain dict: the pools reference their
+# loop, so an entry is only dropped by closing it (see close_async_pools).
+_async_pools = {}
+
+
+def get_pool(db_name, max_size=5, max_age=300.0, timeout=None):
+    """The shared pool for db_name, created with these settings on first use."""
+    with _pools_lock:
+        pool = _pools.get(db_name)
+        if pool is None:
+            pool = _pools[db_name] = SQLitePool(db_name, max_size, max_age, timeout)
+        return pool
+
+
+async def _close_on_shutdown(loop):
+    # Parked for the life of the loop. loop.shutdown_asyncgens(), which
+    # asyncio.run() calls before closing the loop, closes it and so the pools.
+    try:
+        yield
+    finally:
+        await _close_loop_pools(loop)
+
+
+async def _close_loop_pools(loop):
+    pools, _ = _async_pools.pop(loop, ({}, None))
+    for pool in pools.values():
+        await pool.close()
+
+
+async def get_async_pool(db_name, max_size=5, max_age=300.0):
+    """
+    The shared AsyncSQLitePool for db_name on the running event loop. The
+    loop's pools are closed when asyncio.run() shuts it down; a loop run
+    any other way must await close_async_pools() before it is closed.
+    """
+    loop = asyncio.get_running_loop()
+    entry = _async_pools.get(loop)
+    if entry is None:
+        guard = _close_on_shutdown(loop)
+        await guard.__anext__()  # now tracked by the loop's shutdown_asyncgens()
+        entry = _async_pools[loop] = ({}, guard)
+    pools = entry[0]
+    pool = pools.get(db_name)
+    if pool is None:
+        pool = pools[db_name] = AsyncSQLitePool(db_name, max_size, max_age)
+    return pool
+
+
+async def close_async_pools():
+    """Closes every AsyncSQLitePool of the running event loop."""
+    entry = _async_pools.get(asyncio.get_running_loop())
+    if entry is not None:
+        await entry[1].aclose()  # runs the guard's finally: _close_loop_pools
+
+
+def with_db_connection(db_name='users.db', pooled=False, max_size=5, max_age=300.0):
+    """
+    Decorator that passes a connection to db_name as the first argument and
+    closes it afterwards; errors are printed and the call returns None.
+    pooled=True borrows a warm connection from the shared pool for db_name
+    (see SQLitePool) instead of opening one per call. async def functions
+    get an aiosqlite connection (see AsyncSQLitePool).
+    """
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                pool = await get_async_pool(db_name, max_size, max_age) if pooled else None
+                conn = await pool.acquire() if pooled else await aiosqlite.connect(db_name)
+                try:
+                    return await func(conn, *args, **kwargs)
+                except Exception as e:
+                    print(f"Error executing query: {e}")
+                finally:
+                    if pooled:
+                        await pool.release(conn)
+                    else:
+                        await conn.close()
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            pool = get_pool(db_name, max_size, max_age) if pooled else None
+            conn = pool.acquire() if pooled else sqlite3.connect(db_name)
+            try:
+                return func(conn, *args, **kwargs)
+            except Exception as e:
+                print(f"Error executing query: {e}")
+            finally:
+                if pooled:
+                    pool.release(conn)
+                else:
+                    conn.close()
+        return wrapper
+    return decorator
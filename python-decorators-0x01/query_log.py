@@ -0,0 +1,190 @@
+import atexit
+import functools
+import hashlib
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import re
+import sys
+import threading
+from collections.abc import Mapping
+
+# Upper bounds (milliseconds) of the per-fingerprint latency histogram buckets
+LATENCY_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000, float("inf"))
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r"\s+")
+
+
+@functools.lru_cache(maxsize=1024)
+def normalize_query(query):
+    """Query text with literals replaced by ? and whitespace collapsed."""
+    return _WHITESPACE.sub(" ", _LITERALS.sub("?", str(query))).strip()
+
+
+def _digest(text):
+    return hashlib.blake2b(text.encode(), digest_size=8).hexdigest()
+
+
+@functools.lru_cache(maxsize=1024)
+def query_fingerprint(query):
+    """Stable id shared by every run of the same query shape."""
+    return _digest(normalize_query(query).lower())
+
+
+def params_fingerprint(params):
+    """Hash of the bound parameters, so values can be correlated but are never logged.
+
+    Accepts a sequence, a mapping of named parameters or a single value.
+    """
+    if params is None or (isinstance(params, (tuple, list)) and not params):
+        return None
+    if isinstance(params, Mapping):
+        params = sorted(params.items(), key=lambda kv: str(kv[0]))
+    return _digest(repr(params))
+
+
+def row_count(result):
+    """Rows in a query result (a list of rows or a cursor), or None if unknown."""
+    if isinstance(result, (list, tuple)):
+        return len(result)
+    rowcount = getattr(result, "rowcount", -1)
+    return rowcount if isinstance(rowcount, int) and rowcount >= 0 else None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: timestamp, level and the record's query fields."""
+    FIELDS = ("function", "query", "fingerprint", "params", "duration_ms", "rows", "error")
+
+    def format(self, record):
+        entry = {"ts": record.created, "level": record.levelname, "msg": record.getMessage()}
+        for field in self.FIELDS:
+            if hasattr(record, field):
+                entry[field] = getattr(record, field)
+        return json.dumps(entry)
+
+
+class LatencyHistograms:
+    """Per-fingerprint latency histograms; cheap enough to update on every query."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.by_fingerprint = {}  # fingerprint -> {"query", "counts", "count", "sum_ms", "max_ms"}
+
+    def observe(self, fingerprint, query, duration_ms):
+        with self.lock:
+            entry = self.by_fingerprint.get(fingerprint)
+            if entry is None:
+                entry = self.by_fingerprint[fingerprint] = {
+                    "query": normalize_query(query),
+                    "counts": [0] * len(LATENCY_BUCKETS_MS),
+                    "count": 0, "sum_ms": 0.0, "max_ms": 0.0,
+                }
+            for i, bound in enumerate(LATENCY_BUCKETS_MS):
+                if duration_ms <= bound:
+                    entry["counts"][i] += 1
+                    break
+            entry["count"] += 1
+            entry["sum_ms"] += duration_ms
+            entry["max_ms"] = max(entry["max_ms"], duration_ms)
+
+    def snapshot(self):
+        """{fingerprint: {query, count, avg_ms, max_ms, buckets}}, buckets cumulative."""
+        with self.lock:
+            result = {}
+            for fingerprint, entry in self.by_fingerprint.items():
+                buckets, running = {}, 0
+                for bound, count in zip(LATENCY_BUCKETS_MS, entry["counts"]):
+                    running += count
+                    buckets["+Inf" if bound == float("inf") else bound] = running
+                result[fingerprint] = {
+                    "query": entry["query"],
+                    "count": entry["count"],
+                    "avg_ms": entry["sum_ms"] / entry["count"],
+                    "max_ms": entry["max_ms"],
+                    "buckets": buckets,
+                }
+            return result
+
+    def dump(self, file=None):
+        """Writes snapshot() as JSON to file (stdout by default)."""
+        json.dump(self.snapshot(), file or sys.stdout, indent=2)
+        (file or sys.stdout).write("\n")
+
+    def reset(self):
+        with self.lock:
+            self.by_fingerprint.clear()
+
+
+class QueryLogger:
+    """
+    Structured query log. Records go through a QueueHandler, so the calling
+    thread only enqueues them; a QueueListener thread formats and writes
+    them to `handler` (JSON lines on stderr by default). Only sample_rate
+    of queries are logged, but failed queries and queries slower than
+    slow_ms always are, and every query is counted in the histograms.
+    """
+
+    def __init__(self, name="queries", sample_rate=1.0, slow_ms=None, handler=None):
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.histograms = LatencyHistograms()
+        if handler is None:
+            handler = logging.StreamHandler()
+            handler.setFormatter(JsonFormatter())
+        self.queue = queue.SimpleQueue()
+        self.listener = logging.handlers.QueueListener(self.queue, handler)
+        # A private, unregistered logger: two QueryLoggers with the same name
+        # must not share handlers, or each would write the other's records
+        self.logger = logging.Logger(name, logging.INFO)
+        self.logger.propagate = False
+        self.logger.addHandler(logging.handlers.QueueHandler(self.queue))
+        self.listener.start()
+        self.running = True
+        atexit.register(self.close)
+
+    def record(self, function, query, params, duration, result=None, error=None,
+               sample_rate=None):
+        """Counts one query in the histograms and logs it if sampled."""
+        duration_ms = duration * 1000
+        query = str(query)
+        fingerprint = query_fingerprint(query)
+        self.histograms.observe(fingerprint, query, duration_ms)
+        rate = self.sample_rate if sample_rate is None else sample_rate
+        slow = self.slow_ms is not None and duration_ms >= self.slow_ms
+        if error is None and not slow and random.random() >= rate:
+            return
+        self.logger.log(
+            logging.ERROR if error is not None else logging.WARNING if slow else logging.INFO,
+            "query failed" if error is not None else "slow query" if slow else "query",
+            extra={
+                "function": function,
+                "query": normalize_query(query),
+                "fingerprint": fingerprint,
+                "params": params_fingerprint(params),
+                "duration_ms": round(duration_ms, 3),
+                "rows": None if error is not None else row_count(result),
+                "error": None if error is None else repr(error),
+            },
+        )
+
+    def close(self):
+        """Flushes queued records and stops the listener thread."""
+        if self.running:
+            self.running = False
+            self.listener.stop()
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def get_query_logger():
+    """The shared QueryLogger used by log_queries, created on first use."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = QueryLogger()
+        return _default
@@ -0,0 +1,235 @@
+import sqlite3
+import sys
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from collections.abc import Mapping
+from contextlib import asynccontextmanager, contextmanager
+
+READ_ACTIONS = (sqlite3.SQLITE_READ,)
+WRITE_ACTIONS = (sqlite3.SQLITE_INSERT, sqlite3.SQLITE_UPDATE, sqlite3.SQLITE_DELETE)
+
+# Every live ResultCache, so a commit can invalidate across all of them
+_caches = weakref.WeakSet()
+# id(conn) -> [(actions, tables), ...] for the trackers open on that connection
+_trackers = {}
+_trackers_lock = threading.Lock()
+
+
+def estimate_size(obj):
+    """Rough deep size in bytes of a query result (lists/tuples/dicts of scalars)."""
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item) for item in obj)
+    elif isinstance(obj, dict):
+        size += sum(estimate_size(k) + estimate_size(v) for k, v in obj.items())
+    return size
+
+
+def params_key(params):
+    """
+    Hashable, value-sensitive form of query parameters for a cache key:
+    a sequence becomes a tuple, a mapping of named parameters its sorted
+    items, and a single value a 1-tuple.
+    """
+    if params is None:
+        return ()
+    if isinstance(params, Mapping):
+        return tuple(sorted(params.items(), key=lambda kv: str(kv[0])))
+    if isinstance(params, (list, tuple)):
+        return tuple(params)
+    return (params,)
+
+
+def _start_tracking(key, actions):
+    """Registers a tracker; returns (tables, authorizer to install or None)."""
+    tables = set()
+    with _trackers_lock:
+        active = _trackers.setdefault(key, [])
+        active.append((actions, tables))
+        if len(active) > 1:
+            return tables, None
+
+    def authorizer(action, arg1, arg2, db_name, source):
+        for wanted, found in _trackers.get(key, ()):
+            if action in wanted and arg1:
+                found.add(arg1.lower())
+        return sqlite3.SQLITE_OK
+    return tables, authorizer
+
+
+def _stop_tracking(key, tables):
+    """Unregisters a tracker; True if it was the last one on the connection."""
+    with _trackers_lock:
+        active = _trackers[key]
+        active[:] = [t for t in active if t[1] is not tables]
+        if active:
+            return False
+        del _trackers[key]
+        return True
+
+
+@contextmanager
+def track_tables(conn, actions):
+    """
+    Collects the (lower-cased) tables that statements prepared on the sqlite3
+    connection `conn` touch with one of `actions`, using SQLite's authorizer
+    hook, so views and subqueries resolve to their real tables. Yields the
+    set, filled in as statements run. Trackers may nest on one connection.
+    """
+    tables, authorizer = _start_tracking(id(conn), actions)
+    if authorizer is not None:
+        conn.set_authorizer(authorizer)
+    try:
+        yield tables
+    finally:
+        if _stop_tracking(id(conn), tables):
+            conn.set_authorizer(None)
+
+
+async def _set_authorizer_async(conn, authorizer):
+    if hasattr(conn, "set_authorizer"):
+        return await conn.set_authorizer(authorizer)
+    # aiosqlite 0.21.0 (pinned in requirements.txt) has no set_authorizer proxy,
+    # so the call is run on the connection's worker thread through the private
+    # Connection._execute and Connection._conn. Re-check on every upgrade.
+    execute = getattr(conn, "_execute", None)
+    raw = getattr(conn, "_conn", None)
+    if execute is None or raw is None:
+        raise RuntimeError(
+            "track_tables_async relies on aiosqlite's private Connection._execute "
+            "and Connection._conn (written against aiosqlite 0.21.0); the installed "
+            "aiosqlite does not have them"
+        )
+    return await execute(raw.set_authorizer, authorizer)
+
+
+@asynccontextmanager
+async def track_tables_async(conn, actions):
+    """track_tables for an aiosqlite connection."""
+    tables, authorizer = _start_tracking(id(conn), actions)
+    try:
+        if authorizer is not None:
+            await _set_authorizer_async(conn, authorizer)
+        yield tables
+    finally:
+        if _stop_tracking(id(conn), tables):
+            await _set_authorizer_async(conn, None)
+
+
+def invalidate_tables(tables):
+    """Drops every cached result, in any ResultCache, that read one of `tables`."""
+    return sum(cache.invalidate_tables(tables) for cache in list(_caches))
+
+
+class ResultCache:
+    """
+    Bounded LRU cache for query results.
+
+    Holds at most max_entries results and max_bytes (estimated) bytes; the
+    least recently used entries are evicted first. Entries older than ttl
+    seconds are treated as misses. None disables a limit. Safe to share
+    between threads.
+
+    Entries can be tagged with the tables they read; invalidate_tables()
+    (or the module-level one, for every cache) drops them after a write.
+    """
+
+    def __init__(self, max_entries=128, max_bytes=None, ttl=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.entries = OrderedDict()  # key -> (value, size, expires_at, tables)
+        self.by_table = {}  # table -> keys of the entries that read it
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.generation = 0  # bumped by every invalidation
+        self.lock = threading.Lock()
+        _caches.add(self)
+
+    def get(self, key):
+        """Returns (True, value) on a hit, (False, None) on a miss."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            value, size, expires_at, _ = entry
+            if expires_at is not None and time.monotonic() >= expires_at:
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return False, None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return True, value
+
+    def set(self, key, value, tables=(), generation=None):
+        """
+        Stores value under key. Pass the `generation` read before running the
+        query: if an invalidation happened since, the result may already be
+        stale and is not stored. Returns whether it was stored.
+        """
+        size = estimate_size(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return False  # would evict everything and still not fit
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self.lock:
+            if generation is not None and generation != self.generation:
+                return False
+            if key in self.entries:
+                self._remove(key)
+            tables = frozenset(t.lower() for t in tables)
+            self.entries[key] = (value, size, expires_at, tables)
+            self.bytes += size
+            for table in tables:
+                self.by_table.setdefault(table, set()).add(key)
+            while ((self.max_entries is not None and len(self.entries) > self.max_entries)
+                   or (self.max_bytes is not None and self.bytes > self.max_bytes)):
+                self._remove(next(iter(self.entries)))
+                self.evictions += 1
+        return True
+
+    def _remove(self, key):
+        _, size, _, tables = self.entries.pop(key)
+        self.bytes -= size
+        for table in tables:
+            keys = self.by_table[table]
+            keys.discard(key)
+            if not keys:
+                del self.by_table[table]
+
+    def invalidate_tables(self, tables):
+        """Drops the entries that read any of `tables`; returns how many."""
+        with self.lock:
+            keys = set()
+            for table in tables:
+                keys |= self.by_table.get(table.lower(), set())
+            for key in keys:
+                self._remove(key)
+            self.invalidations += len(keys)
+            self.generation += 1
+            return len(keys)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.by_table.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "bytes": self.bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Tests for the query decorators: the ResultCache behind cache_query, table
+invalidation through transactional, and the shared connection pools.
+They run against a throwaway users.db, since the numbered modules run
+their examples against ./users.db when imported.
+"""
+import asyncio
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+import connection_pool
+from result_cache import ResultCache, estimate_size, params_key
+
+_cwd = None
+_tmpdir = None
+cache_module = None
+transactional_module = None
+
+
+def setUpModule():
+    global _cwd, _tmpdir, cache_module, transactional_module
+    _cwd = os.getcwd()
+    _tmpdir = tempfile.mkdtemp()
+    os.chdir(_tmpdir)
+    conn = sqlite3.connect("users.db")
+    conn.executescript("""
+        CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT, email TEXT, age INTEGER);
+        CREATE TABLE orders (id INTEGER PRIMARY KEY, user_id INTEGER);
+        INSERT INTO users VALUES (1, 'Ann', 'ann@example.com', 30), (2, 'Bob', 'bob@example.com', 40);
+    """)
+    conn.close()
+    with redirect_stdout(StringIO()):
+        cache_module = __import__('4-cache_query')
+        transactional_module = __import__('2-transactional')
+
+
+def tearDownModule():
+    os.chdir(_cwd)
+    shutil.rmtree(_tmpdir)
+
+
+class TestResultCache(unittest.TestCase):
+    """Bounds, expiry and invalidation of ResultCache."""
+
+    def test_evicts_least_recently_used(self):
+        cache = ResultCache(max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertEqual(cache.get("b"), (False, None))
+        self.assertEqual(cache.get("a"), (True, 1))
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_max_bytes(self):
+        """Entries are evicted to stay under max_bytes; oversized ones are refused."""
+        row = [(1, "x" * 100)]
+        cache = ResultCache(max_entries=None, max_bytes=3 * estimate_size(row))
+        self.assertFalse(cache.set("big", ["x" * 5000]))
+        for i in range(10):
+            cache.set(i, row)
+        self.assertLessEqual(cache.stats()["bytes"], cache.max_bytes)
+        self.assertEqual(cache.stats()["entries"], 3)
+
+    def test_ttl(self):
+        cache = ResultCache(ttl=0)
+        cache.set("a", 1)
+        self.assertEqual(cache.get("a"), (False, None))
+        self.assertEqual(cache.stats()["expirations"], 1)
+
+    def test_invalidate_tables(self):
+        """Only entries that read a written table are dropped."""
+        cache = ResultCache()
+        cache.set("users", 1, tables={"Users"})
+        cache.set("orders", 2, tables={"orders"})
+        self.assertEqual(cache.invalidate_tables({"users"}), 1)
+        self.assertEqual(cache.get("users"), (False, None))
+        self.assertEqual(cache.get("orders"), (True, 2))
+
+    def test_stale_generation_is_not_stored(self):
+        """A result read before an invalidation is not cached after it."""
+        cache = ResultCache()
+        generation = cache.generation
+        cache.invalidate_tables({"users"})
+        self.assertFalse(cache.set("a", 1, {"users"}, generation))
+
+    def test_params_key(self):
+        """Keys depend on parameter values, however they are passed."""
+        self.assertNotEqual(params_key({"id": 1}), params_key({"id": 2}))
+        self.assertEqual(params_key({"a": 1, "b": 2}), params_key({"b": 2, "a": 1}))
+        self.assertEqual(params_key([1, 2]), params_key((1, 2)))
+        self.assertEqual(params_key(5), (5,))
+        self.assertEqual(params_key(None), ())
+
+
+class TestCacheQuery(unittest.TestCase):
+    """cache_query and transactional on a real connection."""
+
+    def setUp(self):
+        self.conn = sqlite3.connect("users.db")
+        self.addCleanup(self.conn.close)
+
+        @cache_module.cache_query
+        def fetch(conn, query, params=()):
+            return conn.execute(query, params).fetchall()
+
+        @transactional_module.transactional
+        def execute(conn, query, params=()):
+            conn.execute(query, params)
+
+        self.fetch = fetch
+        self.execute = execute
+
+    def call(self, func, *args):
+        with redirect_stdout(StringIO()):
+            return func(self.conn, *args)
+
+    def test_hit_and_miss_by_params(self):
+        query = "SELECT name FROM users WHERE id = :id"
+        self.assertEqual(self.call(self.fetch, query, {"id": 1}), [("Ann",)])
+        self.assertEqual(self.call(self.fetch, query, {"id": 2}), [("Bob",)])
+        self.assertEqual(self.call(self.fetch, query, {"id": 1}), [("Ann",)])
+        stats = self.fetch.cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 2))
+
+    def test_commit_invalidates_tables_read(self):
+        """A committed write to users drops cached reads of users only."""
+        users = "SELECT age FROM users WHERE id = ?"
+        orders = "SELECT COUNT(*) FROM orders"
+        self.call(self.fetch, users, (1,))
+        self.call(self.fetch, orders)
+        self.call(self.execute, "UPDATE users SET age = age + 1 WHERE id = ?", (1,))
+        self.addCleanup(self.conn.execute, "UPDATE users SET age = 30 WHERE id = 1")
+        self.addCleanup(self.conn.commit)
+        self.assertEqual(self.call(self.fetch, users, (1,)), [(31,)])
+        self.call(self.fetch, orders)
+        stats = self.fetch.cache.stats()
+        self.assertEqual(stats["invalidations"], 1)
+        self.assertEqual(stats["hits"], 1)
+
+    def test_rollback_keeps_cache(self):
+        """A failed transaction invalidates nothing."""
+        users = "SELECT COUNT(*) FROM users"
+        self.call(self.fetch, users)
+        with self.assertRaises(sqlite3.Error):
+            self.call(self.execute, "INSERT INTO users (id) VALUES (1)")
+        self.call(self.fetch, users)
+        self.assertEqual(self.fetch.cache.stats()["hits"], 1)
+
+    def test_async_single_flight(self):
+        """Concurrent async misses for one query run it once."""
+        calls = []
+
+        @cache_module.cache_query
+        async def fetch(conn, query, params=()):
+            calls.append(query)
+            await asyncio.sleep(0.01)
+            async with conn.execute(query, params) as cursor:
+                return await cursor.fetchall()
+
+        @connection_pool.with_db_connection(pooled=True)
+        async def fetch_pooled(conn, query):
+            return await fetch(conn, query)
+
+        async def main():
+            return await asyncio.gather(*(fetch_pooled("SELECT COUNT(*) FROM users")
+                                          for _ in range(5)))
+
+        with redirect_stdout(StringIO()):
+            results = asyncio.run(main())
+        self.assertEqual(results, [[(2,)]] * 5)
+        self.assertEqual(len(calls), 1)
+
+
+@connection_pool.with_db_connection(pooled=True)
+async def count_users(conn):
+    async with conn.execute("SELECT COUNT(*) FROM users") as cursor:
+        return (await cursor.fetchone())[0]
+
+
+class TestAsyncPools(unittest.TestCase):
+    """Pools are per event loop and closed with it."""
+
+    def test_pools_closed_when_loop_shuts_down(self):
+        for _ in range(3):
+            self.assertEqual(asyncio.run(count_users()), 2)
+        self.assertEqual(len(connection_pool._async_pools), 0)
+
+    def test_close_async_pools(self):
+        async def main():
+            await count_users()
+            pool = await connection_pool.get_async_pool('users.db')
+            await connection_pool.close_async_pools()
+            return pool
+
+        pool = asyncio.run(main())
+        self.assertTrue(pool.closed)
+        self.assertEqual(pool.opened, {})
+        self.assertEqual(len(connection_pool._async_pools), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,24 +1,65 @@
-import os
-import psycopg2
-from psycopg2.extras import RealDictCursor
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
-
-def stream_users():
-    """Generator that yields users one by one from the database."""
-    conn = psycopg2.connect(
-        dbname=os.getenv("PG_DB", "alx_prodev"),
-        user=os.getenv("PG_USER"),
-        password=os.getenv("PG_PASSWORD"),
-        host=os.getenv("PG_HOST", "localhost"),
-        port=os.getenv("PG_PORT", "5432"),
-        cursor_factory=RealDictCursor
-    )
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM user_data;")
-    for row in cursor:
-        yield dict(row)
-    cursor.close()
-    conn.close()
+from backends import get_backend
+from checkpoint import Checkpoint
+from query_builder import build_select
+from records import row_factory
+
+# Rows pulled per network round trip by the server-side cursor
+DEFAULT_ITERSIZE = 2000
+
+
+def stream_users(server_side=False, itersize=DEFAULT_ITERSIZE, columns=None, where=None,
+                 order_by=None, row_type="dict", backend=None):
+    """Generator that yields users one by one from the database.
+
+    With server_side=True the query runs on a named (server-side) cursor,
+    so rows are fetched from PostgreSQL itersize at a time instead of the
+    whole result set being loaded into client memory before the first yield.
+
+    columns limits the fields fetched (all by default) and where is a list
+    of (column, op, value) filters; both are compiled into the query, so
+    only the needed rows and columns leave the server. order_by names a
+    column to sort on. row_type picks the record yielded per row: "dict",
+    or the more compact "slots" (records.UserRow) or "tuple"
+    (records.UserTuple). backend selects the database (PostgreSQL by
+    default, see backends).
+    """
+    backend = get_backend(backend)
+    conn = backend.connect()
+    try:
+        # Named cursors live inside a transaction on the server
+        cursor = backend.cursor(conn, name="stream_users_cursor" if server_side else None,
+                                itersize=itersize)
+        query, params, columns = build_select(columns, where, order_by,
+                                               placeholder=backend.placeholder)
+        cursor.execute(query, params)
+        make_row = row_factory(columns, row_type)
+        for row in cursor:
+            yield make_row(row)
+        cursor.close()
+    finally:
+        conn.close()
+
+
+def stream_users_resumable(state_file, checkpoint_every=DEFAULT_ITERSIZE, row_type="dict",
+                           backend=None):
+    """Generator like stream_users that can pick up where a dead run stopped.
+
+    Users are streamed in user_id order and the last user_id handed to the
+    caller is saved to state_file every checkpoint_every rows. A new call
+    with the same state_file starts right after that key, so a crash costs
+    at most checkpoint_every rows of rework. The file is removed once the
+    scan completes.
+    """
+    checkpoint = Checkpoint(state_file)
+    last = checkpoint.load()
+    where = [("user_id", ">", last)] if last else None
+    count = 0
+    for user in stream_users(server_side=True, itersize=checkpoint_every, where=where,
+                             order_by="user_id", row_type=row_type, backend=backend):
+        yield user
+        # Reached only once the caller asks for the next row
+        last = user["user_id"] if row_type == "dict" else user.user_id
+        count += 1
+        if count % checkpoint_every == 0:
+            checkpoint.save(last)
+    checkpoint.clear()
@@ -1,50 +1,105 @@
 #!/usr/bin/python3
-import os
-import psycopg2
-from dotenv import load_dotenv
+from backends import get_backend
+from prefetch import prefetch
+from query_builder import build_select
+from records import row_factory
+
+try:
+    import numpy as np
+except ImportError:  # only needed for the columnar layouts
+    np = None
+
+# Array dtype of each column in the columnar batches; age is always float64
+COLUMN_DTYPES = {"user_id": "U36", "name": "O", "email": "O", "age": "f8"}
 
-# Load environment variables from .env file
-load_dotenv()
 
 # Database connection setup
-def get_connection():
-    return psycopg2.connect(
-        host=os.getenv("PG_HOST"),
-        database=os.getenv("PG_DB"),
-        user=os.getenv("PG_USER"),
-        password=os.getenv("PG_PASSWORD"),
-        port=os.getenv("PG_PORT", 5432)
-    )
+def get_connection(backend=None):
+    return get_backend(backend).connect()
+
+
+def to_columns(rows, layout, columns):
+    """
+    Converts a fetchmany() batch of tuples (one value per name in columns)
+    into a dict of column arrays ("columns") or a NumPy structured array
+    ("structured").
+    """
+    if layout == "structured":
+        dtype = [(c, COLUMN_DTYPES[c]) for c in columns]
+        if "user_id" in columns:
+            i = columns.index("user_id")
+            rows = [r[:i] + (str(r[i]),) + r[i + 1:] for r in rows]
+        return np.array([tuple(r) for r in rows], dtype=dtype)
+    return {
+        c: np.array(values, dtype=np.float64 if c == "age" else object)
+        for c, values in zip(columns, zip(*rows))
+    }
 
 
 # Generator: fetch users in batches
-def stream_users_in_batches(batch_size):
+def stream_users_in_batches(batch_size, layout="rows", columns=None, where=None,
+                            backend=None):
     """
     Yields user records from the users table in batches of batch_size.
+    layout="rows" yields a list of dicts; "slots" and "tuple" yield lists
+    of records.UserRow / records.UserTuple; "columns" and "structured"
+    yield column arrays (see to_columns).
+    columns and where are pushed down into the query (see query_builder).
+    backend selects the database (PostgreSQL by default, see backends).
     """
-    conn = get_connection()
+    if layout not in ("rows", "slots", "tuple", "columns", "structured"):
+        raise ValueError(f"Unknown batch layout: {layout}")
+    if layout in ("columns", "structured") and np is None:
+        raise ImportError("Columnar batches require numpy")
+
+    backend = get_backend(backend)
+    conn = backend.connect()
     cur = conn.cursor()
-    cur.execute("SELECT user_id, name, email, age FROM user_data;")
+    query, params, columns = build_select(columns, where, placeholder=backend.placeholder)
+    cur.execute(query, params)
+    if layout in ("columns", "structured"):
+        make_row = None
+    else:
+        make_row = row_factory(columns, "dict" if layout == "rows" else layout)
 
     while True:
         rows = cur.fetchmany(batch_size)
         if not rows:
             break
-        yield [
-            {"user_id": r[0], "name": r[1], "email": r[2], "age": r[3]}
-            for r in rows
-        ]
+        if make_row is not None:
+            yield [make_row(r) for r in rows]
+        else:
+            yield to_columns(rows, layout, columns)
 
     cur.close()
     conn.close()
 
 
 # Process batches: filter users over 25
-def batch_processing(batch_size):
+def batch_processing(batch_size, columnar=False, prefetch_depth=0, pushdown=True):
     """
     Processes each batch of users and prints only those older than 25.
+    With pushdown=True the age filter runs in the database, so only
+    matching rows are fetched; otherwise every row is fetched and filtered
+    here. With columnar=True each batch is filtered with a single
+    vectorized mask. With prefetch_depth > 0 the next batches are fetched
+    in the background while the current one is processed.
     """
-    for batch in stream_users_in_batches(batch_size):
+    batches = stream_users_in_batches(
+        batch_size,
+        layout="structured" if columnar else "rows",
+        where=[("age", ">", 25)] if pushdown else None,
+    )
+    if prefetch_depth:
+        batches = prefetch(batches, depth=prefetch_depth)
+
+    if columnar:
+        for batch in batches:
+            for user in batch[batch["age"] > 25]:
+                print(user)
+        return
+
+    for batch in batches:
         for user in batch:
             if user["age"] > 25:
                 print(user)
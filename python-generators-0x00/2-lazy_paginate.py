@@ -1,41 +1,105 @@
 #!/usr/bin/python3
-import psycopg2
-import psycopg2.extras
-from dotenv import load_dotenv
-import os
-
-# Load environment variables from .env file
-load_dotenv()
-
-DB_NAME = os.getenv("PG_DB")
-DB_USER = os.getenv("PG_USER")
-DB_PASSWORD = os.getenv("PG_PASSWORD")
-DB_HOST = os.getenv("PG_HOST", "localhost")
-DB_PORT = os.getenv("PG_PORT", "5432")
-
-
-def paginate_users(page_size, offset):
-    """Fetch a single page of users from the database."""
-    conn = psycopg2.connect(
-        dbname=DB_NAME, user=DB_USER, password=DB_PASSWORD, host=DB_HOST, port=DB_PORT
-    )
-    cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-    cur.execute("SELECT * FROM user_data LIMIT %s OFFSET %s;", (page_size, offset))
-    rows = cur.fetchall()
+import base64
+from backends import get_backend
+from checkpoint import Checkpoint
+from prefetch import prefetch
+from query_builder import USER_COLUMNS
+
+
+def paginate_users(page_size, offset, backend=None):
+    """Fetch a single page of users from the database.
+
+    Kept for callers that address pages by offset; each call opens a
+    connection and scans past `offset` rows. lazy_pagination uses keyset
+    pages instead.
+    """
+    backend = get_backend(backend)
+    p = backend.placeholder
+    conn = backend.connect()
+    cur = conn.cursor()
+    cur.execute(f"SELECT * FROM user_data LIMIT {p} OFFSET {p};", (page_size, offset))
+    rows = [dict(zip(USER_COLUMNS, r)) for r in cur.fetchall()]
     cur.close()
     conn.close()
     return rows
 
 
-def lazy_pagination(page_size):
+def lazy_pagination(page_size, prefetch_depth=0, backend=None):
     """
     Generator that lazily loads paginated data from the users table.
-    Uses only one loop and yields one page at a time.
+    Uses only one loop and yields one page at a time. Pages are read by
+    keyset on user_id over one connection (see keyset_pagination), so
+    every page costs the same however deep the walk goes.
+    With prefetch_depth > 0 upcoming pages are fetched in the background.
+    """
+    if prefetch_depth:
+        yield from prefetch(lazy_pagination(page_size, backend=backend), depth=prefetch_depth)
+        return
+
+    for rows, _ in keyset_pagination(page_size, backend=backend):
+        yield rows
+
+
+def encode_token(user_id):
+    """Turn the last seen user_id into an opaque continuation token."""
+    return base64.urlsafe_b64encode(str(user_id).encode()).decode()
+
+
+def decode_token(token):
+    """Recover the user_id a continuation token points past."""
+    return base64.urlsafe_b64decode(token.encode()).decode()
+
+
+def paginate_users_keyset(conn, page_size, after=None, placeholder="%s"):
+    """
+    Fetch the page of users that comes right after user_id `after`.
+    Seeks on the primary key index, so every page costs the same.
+    """
+    p = placeholder
+    cur = conn.cursor()
+    if after is None:
+        cur.execute(
+            f"SELECT * FROM user_data ORDER BY user_id LIMIT {p};", (page_size,)
+        )
+    else:
+        cur.execute(
+            f"SELECT * FROM user_data WHERE user_id > {p} "
+            f"ORDER BY user_id LIMIT {p};",
+            (after, page_size),
+        )
+    rows = [dict(zip(USER_COLUMNS, r)) for r in cur.fetchall()]
+    cur.close()
+    return rows
+
+
+def keyset_pagination(page_size, token=None, backend=None):
+    """
+    Generator that walks user_data page by page over a single connection.
+    Yields (page, next_token); pass next_token back in to resume later.
+    """
+    backend = get_backend(backend)
+    conn = backend.connect()
+    after = decode_token(token) if token else None
+    try:
+        while True:
+            rows = paginate_users_keyset(conn, page_size, after, backend.placeholder)
+            if not rows:
+                break
+            after = rows[-1]["user_id"]
+            yield rows, encode_token(after)
+    finally:
+        conn.close()
+
+
+def resumable_pagination(page_size, state_file, backend=None):
+    """
+    Generator like lazy_pagination that survives restarts. The continuation
+    token of each page is saved to state_file once the caller moves on to
+    the next page, and a new call resumes from it. A crash costs at most
+    one page of rework; the file is removed when the walk completes.
     """
-    offset = 0
-    while True:
-        rows = paginate_users(page_size, offset)
-        if not rows:
-            break
+    checkpoint = Checkpoint(state_file)
+    for rows, token in keyset_pagination(page_size, checkpoint.load(), backend):
         yield rows
-        offset += page_size
+        checkpoint.save(token)
+    checkpoint.clear()
@@ -1,9 +1,15 @@
 #!/usr/bin/python3
-import seed  # reuse the connection logic from seed.py
+from backends import get_backend
 
-def stream_user_ages():
+try:
+    import numpy as np
+except ImportError:  # only needed by the client-side fallback
+    np = None
+
+
+def stream_user_ages(backend=None):
     """Generator that yields user ages one by one from the database."""
-    connection = seed.connect_to_prodev()
+    connection = get_backend(backend).connect()
     cursor = connection.cursor()
     cursor.execute("SELECT age FROM user_data;")
 
@@ -15,21 +21,105 @@ def stream_user_ages():
     connection.close()
 
 
-def calculate_average_age():
-    """Calculates the average age of all users using the generator."""
-    total_age = 0
+def aggregate_ages(bucket_width=10, backend=None):
+    """
+    Computes count, avg, min, max and a histogram of ages inside the database.
+    Only the summary rows cross the network. Histogram keys are the lower
+    bound of each bucket_width-wide bucket.
+    """
+    backend = get_backend(backend)
+    p = backend.placeholder
+    connection = backend.connect()
+    cursor = connection.cursor()
+    cursor.execute("SELECT COUNT(age), AVG(age), MIN(age), MAX(age) FROM user_data;")
+    count, avg, min_age, max_age = cursor.fetchone()
+    cursor.execute(f"""
+        SELECT FLOOR(age / {p}) * {p} AS bucket, COUNT(*)
+        FROM user_data
+        GROUP BY bucket
+        ORDER BY bucket;
+    """, (bucket_width, bucket_width))
+    histogram = {float(bucket): n for bucket, n in cursor.fetchall()}
+    cursor.close()
+    connection.close()
+
+    return {
+        "count": count,
+        "avg": float(avg) if avg is not None else None,
+        "min": float(min_age) if min_age is not None else None,
+        "max": float(max_age) if max_age is not None else None,
+        "histogram": histogram,
+    }
+
+
+def aggregate_ages_client(bucket_width=10, chunk_size=10000, backend=None):
+    """
+    Same result as aggregate_ages, computed on the client with NumPy.
+    Ages are pulled with fetchmany, so the Python loop runs once per chunk.
+    """
+    if np is None:
+        raise ImportError("aggregate_ages_client requires numpy")
+
+    connection = get_backend(backend).connect()
+    cursor = connection.cursor()
+    cursor.execute("SELECT age FROM user_data;")
+
     count = 0
+    total = 0.0
+    min_age = np.inf
+    max_age = -np.inf
+    histogram = {}
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        ages = np.fromiter((r[0] for r in rows), dtype=np.float64, count=len(rows))
+        count += ages.size
+        total += ages.sum()
+        min_age = min(min_age, ages.min())
+        max_age = max(max_age, ages.max())
+        buckets, counts = np.unique(np.floor(ages / bucket_width) * bucket_width,
+                                    return_counts=True)
+        for bucket, n in zip(buckets.tolist(), counts.tolist()):
+            histogram[bucket] = histogram.get(bucket, 0) + n
+
+    cursor.close()
+    connection.close()
+
+    return {
+        "count": count,
+        "avg": float(total / count) if count else None,
+        "min": float(min_age) if count else None,
+        "max": float(max_age) if count else None,
+        "histogram": dict(sorted(histogram.items())),
+    }
+
+
+def calculate_average_age(pushdown=True):
+    """Calculates the average age of all users.
+
+    By default the average is computed by the database; pushdown=False
+    computes it on the client with aggregate_ages_client, or by consuming
+    the generator when numpy is not installed.
+    """
+    if pushdown or np is not None:
+        stats = aggregate_ages() if pushdown else aggregate_ages_client()
+        count, average_age = stats["count"], stats["avg"]
+    else:
+        total_age = 0
+        count = 0
+
+        # One loop — consume the generator
+        for age in stream_user_ages():
+            total_age += age
+            count += 1
 
-    # One loop — consume the generator
-    for age in stream_user_ages():
-        total_age += age
-        count += 1
+        average_age = total_age / count if count else None
 
     if count == 0:
         print("No user data found.")
         return
 
-    average_age = total_age / count
     print(f"Average age of users: {average_age:.2f}")
 
 
@@ -0,0 +1,208 @@
+#!/usr/bin/python3
+"""async for versions of the user_data generators.
+
+PostgreSQL goes through psycopg 3's async driver and one shared
+AsyncConnectionPool; SQLite through aiosqlite. Scans never block the event
+loop, so one loop can run many of them at once.
+"""
+import asyncio
+
+from query_builder import USER_COLUMNS, build_select
+from records import row_factory
+
+DEFAULT_ITERSIZE = 2000
+
+# event loop -> [lock guarding pool creation, AsyncConnectionPool or None,
+# shutdown guard]. A pool's connections and worker tasks belong to (and
+# reference) the loop that opened it, so entries are dropped explicitly.
+_pools = {}
+
+
+async def _close_on_shutdown(loop):
+    # Parked for the life of the loop. loop.shutdown_asyncgens(), which
+    # asyncio.run() calls before closing the loop, closes it and so the pool.
+    try:
+        yield
+    finally:
+        entry = _pools.pop(loop, None)
+        if entry is not None and entry[1] is not None:
+            await entry[1].close()
+
+
+async def _loop_entry(loop):
+    entry = _pools.get(loop)
+    if entry is None:
+        guard = _close_on_shutdown(loop)
+        entry = _pools[loop] = [asyncio.Lock(), None, guard]
+        await guard.__anext__()  # now tracked by the loop's shutdown_asyncgens()
+    return entry
+
+
+async def get_async_pool():
+    """
+    Returns the running loop's shared async pool, opening it on first use.
+    The pool is closed when asyncio.run() shuts the loop down; a loop run
+    any other way must await close_async_pool() before it is closed.
+    """
+    entry = await _loop_entry(asyncio.get_running_loop())
+    async with entry[0]:
+        if entry[1] is None:
+            from psycopg_pool import AsyncConnectionPool
+            from db_pool import (DB_HOST, DB_NAME, DB_PASSWORD, DB_PORT, DB_USER,
+                                 POOL_MAX, POOL_MAX_IDLE, POOL_MIN)
+            pool = AsyncConnectionPool(
+                kwargs={"dbname": DB_NAME, "user": DB_USER, "password": DB_PASSWORD,
+                        "host": DB_HOST, "port": DB_PORT},
+                min_size=POOL_MIN,
+                max_size=POOL_MAX,
+                max_idle=POOL_MAX_IDLE,
+                check=AsyncConnectionPool.check_connection,
+                open=False,
+            )
+            await pool.open()
+            entry[1] = pool
+        return entry[1]
+
+
+async def close_async_pool():
+    """Closes the running loop's shared pool (e.g. on service shutdown)."""
+    entry = _pools.get(asyncio.get_running_loop())
+    if entry is not None:
+        async with entry[0]:
+            await entry[2].aclose()  # runs the guard's finally
+
+
+class AsyncPostgresBackend:
+    """Borrows connections from the shared psycopg 3 async pool."""
+    name = "postgres"
+    placeholder = "%s"
+
+    def connection(self):
+        return _PooledConnection()
+
+    async def cursor(self, conn, name=None, itersize=None):
+        """A named (server-side) cursor when `name` is given."""
+        if name is None:
+            return conn.cursor()
+        cursor = conn.cursor(name=name)
+        if itersize:
+            cursor.itersize = itersize
+        return cursor
+
+
+class _PooledConnection:
+    """async with wrapper that borrows from the pool once it exists."""
+
+    async def __aenter__(self):
+        self._borrow = (await get_async_pool()).connection()
+        return await self._borrow.__aenter__()
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        return await self._borrow.__aexit__(exc_type, exc_val, exc_tb)
+
+
+class AsyncSQLiteBackend:
+    """Opens an aiosqlite connection per scan to the database at `path`."""
+    name = "sqlite"
+    placeholder = "?"
+
+    def __init__(self, path):
+        self.path = path
+
+    def connection(self):
+        import aiosqlite
+        return aiosqlite.connect(self.path)
+
+    async def cursor(self, conn, name=None, itersize=None):
+        cursor = await conn.cursor()
+        if itersize:
+            cursor.arraysize = itersize
+        return cursor
+
+
+_default = AsyncPostgresBackend()
+
+
+def get_backend(backend=None):
+    """Returns `backend`, or the default async PostgreSQL backend when None."""
+    return _default if backend is None else backend
+
+
+async def stream_users(server_side=True, itersize=DEFAULT_ITERSIZE, columns=None, where=None,
+                       order_by=None, row_type="dict", backend=None):
+    """Async generator that yields users one by one (see 0-stream_users)."""
+    backend = get_backend(backend)
+    query, params, columns = build_select(columns, where, order_by,
+                                          placeholder=backend.placeholder)
+    make_row = row_factory(columns, row_type)
+    async with backend.connection() as conn:
+        cursor = await backend.cursor(conn, name="stream_users_cursor" if server_side else None,
+                                      itersize=itersize)
+        try:
+            await cursor.execute(query, params)
+            async for row in cursor:
+                yield make_row(row)
+        finally:
+            await cursor.close()
+
+
+async def stream_users_in_batches(batch_size, columns=None, where=None, row_type="dict",
+                                  backend=None):
+    """Async generator that yields lists of batch_size users (see 1-batch_processing)."""
+    backend = get_backend(backend)
+    query, params, columns = build_select(columns, where, placeholder=backend.placeholder)
+    make_row = row_factory(columns, row_type)
+    async with backend.connection() as conn:
+        cursor = await backend.cursor(conn, name="stream_batches_cursor", itersize=batch_size)
+        try:
+            await cursor.execute(query, params)
+            while True:
+                rows = await cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield [make_row(r) for r in rows]
+        finally:
+            await cursor.close()
+
+
+async def lazy_pagination(page_size, backend=None):
+    """
+    Async generator that yields pages of page_size users. Pages are
+    fetched by keyset on user_id over a single connection (see 2-lazy_paginate).
+    """
+    backend = get_backend(backend)
+    p = backend.placeholder
+    async with backend.connection() as conn:
+        after = None
+        while True:
+            cursor = await backend.cursor(conn)
+            if after is None:
+                await cursor.execute(
+                    f"SELECT * FROM user_data ORDER BY user_id LIMIT {p};", (page_size,)
+                )
+            else:
+                await cursor.execute(
+                    f"SELECT * FROM user_data WHERE user_id > {p} "
+                    f"ORDER BY user_id LIMIT {p};",
+                    (after, page_size),
+                )
+            rows = [dict(zip(USER_COLUMNS, r)) for r in await cursor.fetchall()]
+            await cursor.close()
+            if not rows:
+                break
+            yield rows
+            after = rows[-1]["user_id"]
+
+
+async def stream_user_ages(backend=None):
+    """Async generator that yields user ages one by one (see 4-stream_ages)."""
+    backend = get_backend(backend)
+    async with backend.connection() as conn:
+        cursor = await backend.cursor(conn, name="stream_ages_cursor",
+                                      itersize=DEFAULT_ITERSIZE)
+        try:
+            await cursor.execute("SELECT age FROM user_data;")
+            async for (age,) in cursor:
+                yield age
+        finally:
+            await cursor.close()
@@ -0,0 +1,122 @@
+#!/usr/bin/python3
+"""Database backends the generators can run against.
+
+PostgreSQL (through db_pool) is the default. SQLiteBackend runs the same
+generators against a local file using the same user_data schema, so they
+can be benchmarked and exercised without a PostgreSQL server.
+"""
+import csv
+import sqlite3
+import uuid
+
+from query_builder import USER_DATA_INDEXES, USER_DATA_SCHEMA
+
+
+class PostgresBackend:
+    """Borrows connections from the shared psycopg2 pool."""
+    name = "postgres"
+    placeholder = "%s"
+
+    def __init__(self, dbname=None):
+        self.dbname = dbname
+
+    def connect(self):
+        import db_pool  # imported lazily so SQLite runs don't need psycopg2
+        return db_pool.connect(self.dbname)
+
+    def cursor(self, conn, name=None, itersize=None):
+        """A named (server-side) cursor when `name` is given."""
+        if name is None:
+            return conn.cursor()
+        cursor = conn.cursor(name=name)
+        if itersize:
+            cursor.itersize = itersize
+        return cursor
+
+    def explain(self, conn, query, params=()):
+        """The planner's plan for `query`, one line per plan node."""
+        cursor = conn.cursor()
+        cursor.execute("EXPLAIN " + query, params)
+        plan = [line for (line,) in cursor.fetchall()]
+        cursor.close()
+        return plan
+
+
+class SQLiteBackend:
+    """Opens a connection per call to the SQLite database at `path`."""
+    name = "sqlite"
+    placeholder = "?"
+
+    def __init__(self, path):
+        self.path = path
+
+    def connect(self):
+        return sqlite3.connect(self.path)
+
+    def cursor(self, conn, name=None, itersize=None):
+        """SQLite cursors already step through results lazily."""
+        cursor = conn.cursor()
+        if itersize:
+            cursor.arraysize = itersize
+        return cursor
+
+    def explain(self, conn, query, params=()):
+        """EXPLAIN QUERY PLAN output, indented to show the plan tree."""
+        rows = conn.execute("EXPLAIN QUERY PLAN " + query, params).fetchall()
+        depth = {0: -1}
+        plan = []
+        for node, parent, _, detail in rows:
+            depth[node] = depth.get(parent, -1) + 1
+            plan.append("  " * depth[node] + detail)
+        return plan
+
+    def create_schema(self):
+        conn = self.connect()
+        conn.execute(USER_DATA_SCHEMA)
+        conn.commit()
+        conn.close()
+
+    def create_indexes(self):
+        """Creates USER_DATA_INDEXES and refreshes planner statistics."""
+        conn = self.connect()
+        for statement in USER_DATA_INDEXES:
+            conn.execute(statement)
+        conn.execute("ANALYZE user_data;")
+        conn.commit()
+        conn.close()
+
+    def load_csv(self, csv_file, rows=None, batch_size=10000):
+        """
+        Fills user_data from the CSV fixture, cycling through it until
+        `rows` rows exist (one pass if rows is None). Rows without a
+        user_id get a fresh UUID. Returns the number of rows inserted.
+        """
+        with open(csv_file, newline='', encoding='utf-8') as f:
+            fixture = list(csv.DictReader(f))
+        if not fixture:
+            return 0
+        target = len(fixture) if rows is None else rows
+
+        conn = self.connect()
+        cursor = conn.cursor()
+        batch = []
+        for i in range(target):
+            row = fixture[i % len(fixture)]
+            user_id = row.get('user_id') if i < len(fixture) else None
+            batch.append((user_id or str(uuid.uuid4()), row['name'], row['email'], row['age']))
+            if len(batch) == batch_size:
+                cursor.executemany("INSERT INTO user_data VALUES (?, ?, ?, ?);", batch)
+                batch.clear()
+        if batch:
+            cursor.executemany("INSERT INTO user_data VALUES (?, ?, ?, ?);", batch)
+        conn.commit()
+        conn.close()
+        return target
+
+
+_default = PostgresBackend()
+
+
+def get_backend(backend=None):
+    """Returns `backend`, or the default PostgreSQL backend when None."""
+    return _default if backend is None else backend
@@ -0,0 +1,105 @@
+#!/usr/bin/python3
+"""Benchmark the user_data generators against a SQLite copy of the fixture.
+
+Usage: python3 benchmark.py [rows ...]   (default: 10000 1000000 10000000)
+
+For each table size a SQLite database is filled by cycling through
+user_data.csv, then every generator is drained once for timing (rows/sec,
+time to first row) and once under tracemalloc for peak Python memory.
+The row record types (dict, __slots__ UserRow, UserTuple) are compared on
+throughput and on memory per row held.
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from itertools import islice
+
+from backends import SQLiteBackend
+from records import ROW_TYPES
+
+stream_users = __import__('0-stream_users').stream_users
+stream_users_in_batches = __import__('1-batch_processing').stream_users_in_batches
+keyset_pagination = __import__('2-lazy_paginate').keyset_pagination
+stream_user_ages = __import__('4-stream_ages').stream_user_ages
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'user_data.csv')
+DEFAULT_SIZES = (10_000, 1_000_000, 10_000_000)
+BATCH_SIZE = 1000
+# Rows kept alive when measuring memory per record
+ROW_SAMPLE = 100_000
+
+# name -> (function building the generator, rows per yielded item or None)
+GENERATORS = {
+    "stream": (lambda b: stream_users(server_side=True, backend=b), None),
+    "batch": (lambda b: stream_users_in_batches(BATCH_SIZE, backend=b), len),
+    "paginate": (lambda b: keyset_pagination(BATCH_SIZE, backend=b), lambda p: len(p[0])),
+    "ages": (lambda b: stream_user_ages(backend=b), None),
+}
+
+
+def drain(make, backend, count_rows):
+    """Consumes one generator; returns (rows, seconds, seconds to first row)."""
+    rows = 0
+    first = None
+    start = time.perf_counter()
+    for item in make(backend):
+        if first is None:
+            first = time.perf_counter() - start
+        rows += count_rows(item) if count_rows else 1
+    return rows, time.perf_counter() - start, first or 0.0
+
+
+def peak_memory(make, backend):
+    """Peak bytes allocated by Python while draining one generator."""
+    tracemalloc.start()
+    for _ in make(backend):
+        pass
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def bytes_per_row(backend, row_type, rows):
+    """Average traced bytes per record while `rows` records are held."""
+    tracemalloc.start()
+    held = list(islice(stream_users(row_type=row_type, backend=backend), rows))
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size / len(held) if held else 0
+
+
+def compare_row_types(backend, size):
+    for row_type in ROW_TYPES:
+        make = lambda b: stream_users(server_side=True, row_type=row_type, backend=b)
+        rows, seconds, _ = drain(make, backend, None)
+        rate = rows / seconds if seconds > 0 else 0
+        per_row = bytes_per_row(backend, row_type, min(size, ROW_SAMPLE))
+        print(f"{size:>10} {row_type:<9} {rate:>12,.0f} {per_row:>12.0f}B")
+
+
+def run(sizes):
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            backend = SQLiteBackend(os.path.join(tmp, 'bench.db'))
+            backend.create_schema()
+            backend.load_csv(FIXTURE, rows=size)
+
+            print(f"{'rows':>10} {'generator':<9} {'rows/sec':>12} {'first row':>10} "
+                  f"{'peak mem':>10}")
+            for name, (make, count_rows) in GENERATORS.items():
+                rows, seconds, first = drain(make, backend, count_rows)
+                peak = peak_memory(make, backend)
+                rate = rows / seconds if seconds > 0 else 0
+                print(f"{size:>10} {name:<9} {rate:>12,.0f} {first * 1000:>8.2f}ms "
+                      f"{peak / 1024:>8.0f}KB")
+
+            print(f"{'rows':>10} {'row type':<9} {'rows/sec':>12} {'mem/row':>13}")
+            compare_row_types(backend, size)
+            print()
+
+
+if __name__ == "__main__":
+    run([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
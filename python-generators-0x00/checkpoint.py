@@ -0,0 +1,35 @@
+#!/usr/bin/python3
+"""Local state file recording how far a long scan has got."""
+import json
+import os
+
+
+class Checkpoint:
+    """Stores one resume position (e.g. the last seen user_id) in a JSON file."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        """Returns the saved position, or None if there is nothing to resume."""
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                return json.load(f).get("position")
+        except FileNotFoundError:
+            return None
+
+    def save(self, position):
+        """Writes the position atomically so a crash never leaves half a file."""
+        tmp = f"{self.path}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({"position": position}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    def clear(self):
+        """Forgets the position once a scan has finished."""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,213 @@
+#!/usr/bin/python3
+"""Shared, thread-safe PostgreSQL connection pool for the generators."""
+import os
+import threading
+import time
+
+import psycopg2
+import psycopg2.extensions
+import psycopg2.pool
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+DB_NAME = os.getenv("PG_DB", "alx_prodev")
+DB_USER = os.getenv("PG_USER")
+DB_PASSWORD = os.getenv("PG_PASSWORD")
+DB_HOST = os.getenv("PG_HOST", "localhost")
+DB_PORT = os.getenv("PG_PORT", "5432")
+
+POOL_MIN = int(os.getenv("PG_POOL_MIN", "1"))
+POOL_MAX = int(os.getenv("PG_POOL_MAX", "10"))
+# Idle connections above POOL_MIN are closed after this many seconds
+POOL_MAX_IDLE = float(os.getenv("PG_POOL_MAX_IDLE", "300"))
+# Connections idle longer than this are pinged before being handed out
+POOL_CHECK_AFTER = float(os.getenv("PG_POOL_CHECK_AFTER", "30"))
+
+
+class PooledConnection:
+    """
+    Wraps a psycopg2 connection borrowed from a ConnectionPool.
+    Behaves like the connection itself, except close() returns it
+    to the pool instead of closing the socket.
+    """
+
+    def __init__(self, pool, conn):
+        object.__setattr__(self, "_pool", pool)
+        object.__setattr__(self, "_conn", conn)
+
+    def __getattr__(self, name):
+        if self._conn is None:
+            raise psycopg2.InterfaceError("connection already returned to pool")
+        return getattr(self._conn, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._conn, name, value)
+
+    def __enter__(self):
+        return self._conn.__enter__()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return self._conn.__exit__(exc_type, exc_val, exc_tb)
+
+    @property
+    def raw(self):
+        """The underlying psycopg2 connection, for C APIs that reject the proxy."""
+        if self._conn is None:
+            raise psycopg2.InterfaceError("connection already returned to pool")
+        return self._conn
+
+    @property
+    def closed(self):
+        return self._conn is None or self._conn.closed
+
+    def close(self):
+        """Give the connection back to the pool (safe to call twice)."""
+        conn = self._conn
+        if conn is not None:
+            object.__setattr__(self, "_conn", None)
+            self._pool.putconn(conn)
+
+
+class ConnectionPool:
+    """
+    Keeps between minconn and maxconn open connections to one database.
+    Borrowers block while all maxconn connections are in use.
+    """
+
+    def __init__(self, dbname, minconn=POOL_MIN, maxconn=POOL_MAX,
+                 max_idle=POOL_MAX_IDLE, check_after=POOL_CHECK_AFTER):
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError("Need 0 <= minconn <= maxconn and maxconn >= 1")
+        self.dbname = dbname
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.max_idle = max_idle
+        self.check_after = check_after
+        self._idle = []  # (conn, returned_at), most recently used last
+        self._size = 0   # open connections, idle or borrowed
+        self._cond = threading.Condition()
+        for _ in range(minconn):
+            self._idle.append((self._connect(), time.monotonic()))
+            self._size += 1
+
+    def _connect(self):
+        return psycopg2.connect(
+            dbname=self.dbname,
+            user=DB_USER,
+            password=DB_PASSWORD,
+            host=DB_HOST,
+            port=DB_PORT
+        )
+
+    def _is_healthy(self, conn, idle_for):
+        if conn.closed:
+            return False
+        if idle_for < self.check_after:
+            return True
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1;")
+            cursor.close()
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    def _recycle_idle(self):
+        """Close connections above minconn that sat idle too long (lock held)."""
+        now = time.monotonic()
+        expired = []
+        while (self._size - len(expired) > self.minconn and self._idle
+               and now - self._idle[0][1] > self.max_idle):
+            expired.append(self._idle.pop(0)[0])
+        self._size -= len(expired)
+        for conn in expired:
+            conn.close()
+
+    def getconn(self, timeout=None):
+        """Borrow a connection, waiting up to `timeout` seconds if exhausted."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._cond:
+                self._recycle_idle()
+                while not self._idle and self._size >= self.maxconn:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise psycopg2.pool.PoolError("connection pool exhausted")
+                    self._cond.wait(remaining)
+                if self._idle:
+                    conn, returned_at = self._idle.pop()
+                else:
+                    conn, returned_at = None, None
+                    self._size += 1
+
+            if conn is None:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+                return PooledConnection(self, conn)
+
+            if self._is_healthy(conn, time.monotonic() - returned_at):
+                return PooledConnection(self, conn)
+            self._discard(conn)
+
+    def putconn(self, conn):
+        """Return a connection, resetting any state the borrower left behind."""
+        if conn.closed:
+            self._discard(conn)
+            return
+        try:
+            status = conn.get_transaction_status()
+            if status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+            if conn.autocommit:
+                conn.autocommit = False
+        except psycopg2.Error:
+            self._discard(conn)
+            return
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def closeall(self):
+        """Close every idle connection; borrowed ones close when returned."""
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+        for conn, _ in idle:
+            conn.close()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(dbname=None):
+    """Returns the process-wide pool for `dbname` (PG_DB by default)."""
+    # Keyed by pid so forked workers never share a parent's sockets
+    key = (os.getpid(), dbname or DB_NAME)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(key[1])
+        return pool
+
+
+def connect(dbname=None):
+    """Borrow a pooled connection; call close() on it to give it back."""
+    return get_pool(dbname).getconn()
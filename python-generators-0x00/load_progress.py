@@ -0,0 +1,90 @@
+#!/usr/bin/python3
+"""Progress and throughput instrumentation for the CSV loaders."""
+import time
+
+# Upper bounds (seconds) of the batch write latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, float("inf"))
+
+
+class LoadProgress:
+    """
+    Tracks one load: rows written, rows rejected, CSV bytes consumed and
+    per-batch write latency. Every `interval` seconds (checked when a batch
+    is recorded) it logs a one-line summary through `log` and passes
+    snapshot() to `callback`, so the numbers can feed a metrics system.
+    """
+
+    def __init__(self, total_bytes=None, interval=10.0, log=print, callback=None):
+        self.total_bytes = total_bytes
+        self.interval = interval
+        self.log = log
+        self.callback = callback
+        self.rows = 0
+        self.rejected = 0
+        self.bytes = 0
+        self.batches = 0
+        self.latency_sum = 0.0
+        self.latency_counts = [0] * len(LATENCY_BUCKETS)
+        self.started = time.perf_counter()
+        self._last_report = self.started
+
+    def add_batch(self, rows, seconds):
+        """Records one written batch and reports if the interval has passed."""
+        self.rows += rows
+        self.batches += 1
+        self.latency_sum += seconds
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                self.latency_counts[i] += 1
+                break
+        now = time.perf_counter()
+        if now - self._last_report >= self.interval:
+            self._last_report = now
+            self.report()
+
+    def snapshot(self):
+        elapsed = time.perf_counter() - self.started
+        bytes_per_sec = self.bytes / elapsed if elapsed > 0 else 0.0
+        eta = None
+        if self.total_bytes and bytes_per_sec > 0:
+            eta = max(self.total_bytes - self.bytes, 0) / bytes_per_sec
+        # Cumulative counts per upper bound, Prometheus-style
+        cumulative, running = {}, 0
+        for bound, count in zip(LATENCY_BUCKETS, self.latency_counts):
+            running += count
+            cumulative[bound] = running
+        return {
+            "rows": self.rows,
+            "rejected": self.rejected,
+            "bytes": self.bytes,
+            "total_bytes": self.total_bytes,
+            "elapsed": elapsed,
+            "rows_per_sec": self.rows / elapsed if elapsed > 0 else 0.0,
+            "bytes_per_sec": bytes_per_sec,
+            "eta_seconds": eta,
+            "batch_latency": {
+                "count": self.batches,
+                "sum": self.latency_sum,
+                "buckets": cumulative,
+            },
+        }
+
+    def report(self, final=False):
+        snap = self.snapshot()
+        if self.log is not None:
+            done = f" ({snap['bytes'] / snap['total_bytes']:.0%})" if snap["total_bytes"] else ""
+            eta = "" if final or snap["eta_seconds"] is None else f", ETA {snap['eta_seconds']:.0f}s"
+            avg = snap["batch_latency"]["sum"] / self.batches * 1000 if self.batches else 0.0
+            self.log(f"{'Loaded' if final else 'Loading'}: {snap['rows']} rows{done}, "
+                     f"{snap['rows_per_sec']:,.0f} rows/s, "
+                     f"{snap['bytes_per_sec'] / 1048576:.1f} MiB/s, "
+                     f"{snap['rejected']} rejected, {avg:.1f} ms/batch{eta}")
+        if self.callback is not None:
+            self.callback(snap)
+        return snap
+
+    def finish(self):
+        """Emits the final summary; returns the last snapshot."""
+        if self.total_bytes:
+            self.bytes = self.total_bytes
+        return self.report(final=True)
@@ -0,0 +1,96 @@
+#!/usr/bin/python3
+"""Parse large CSV files on several cores.
+
+The file is memory-mapped and cut into chunks at line boundaries; each
+chunk is parsed by a worker process and the rows are handed back to a
+single consumer, in file order or as soon as each chunk is ready.
+Quoted fields must not contain newlines (true for user_data.csv).
+"""
+import csv
+import io
+import mmap
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+DEFAULT_CHUNK_BYTES = 32 * 1024 * 1024
+
+
+def chunk_offsets(csv_file, chunk_bytes=DEFAULT_CHUNK_BYTES):
+    """
+    Returns (header, [(start, end), ...]): the parsed header row and byte
+    ranges covering the data lines, each ending just after a newline.
+    """
+    with open(csv_file, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return [], []
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            header_end = mm.find(b"\n") + 1 or size
+            header = next(csv.reader([mm[:header_end].decode('utf-8')]))
+            offsets = []
+            start = header_end
+            while start < size:
+                end = mm.find(b"\n", min(start + chunk_bytes, size) - 1) + 1 or size
+                offsets.append((start, end))
+                start = end
+    return header, offsets
+
+
+def _parse_chunk(csv_file, start, end, header, row_parser):
+    """Worker: parses one byte range; returns (rows, rejected_count)."""
+    with open(csv_file, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            text = mm[start:end].decode('utf-8')
+    rows, rejected = [], 0
+    for row in csv.DictReader(io.StringIO(text, newline=''), fieldnames=header):
+        parsed = row_parser(row)
+        if parsed is None:
+            rejected += 1
+        else:
+            rows.append(parsed)
+    return rows, rejected
+
+
+def parallel_csv_rows(csv_file, row_parser, workers=None, ordered=True,
+                      chunk_bytes=DEFAULT_CHUNK_BYTES, stats=None):
+    """
+    Generator yielding row_parser(row) for each CSV row (as a dict keyed by
+    the header), parsed in a pool of `workers` processes. row_parser must
+    be a module-level function. When a stats dict is passed, rows for which
+    it returns None are counted in stats["rejected"] and the bytes of the
+    chunks parsed so far in stats["bytes"].
+    ordered=False yields chunks as they finish instead of in file order.
+    """
+    header, offsets = chunk_offsets(csv_file, chunk_bytes)
+    workers = workers or os.cpu_count()
+    pending = iter(offsets)
+    if stats is not None:
+        stats.setdefault("rejected", 0)
+        stats.setdefault("bytes", offsets[0][0] if offsets else 0)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        def submit_next():
+            span = next(pending, None)
+            if span is None:
+                return None
+            future = pool.submit(_parse_chunk, csv_file, span[0], span[1], header, row_parser)
+            future.nbytes = span[1] - span[0]
+            return future
+
+        # Keep every worker busy plus one chunk queued, no more
+        in_flight = [f for f in (submit_next() for _ in range(workers + 1)) if f]
+        while in_flight:
+            if ordered:
+                done = in_flight.pop(0)
+            else:
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                done = finished.pop()
+                in_flight.remove(done)
+            rows, rejected = done.result()
+            if stats is not None:
+                stats["rejected"] += rejected
+                stats["bytes"] += done.nbytes
+            following = submit_next()
+            if following:
+                in_flight.append(following)
+            yield from rows
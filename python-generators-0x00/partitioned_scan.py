@@ -0,0 +1,110 @@
+#!/usr/bin/python3
+"""Parallel scan of user_data split into disjoint user_id ranges."""
+import multiprocessing
+import uuid
+
+from backends import get_backend
+from query_builder import build_select
+
+# Marks the end of one partition's stream on the queue
+_DONE = "done"
+_ERROR = "error"
+_ROWS = "rows"
+
+
+def uuid_ranges(partitions):
+    """
+    Splits the 128-bit UUID space into `partitions` contiguous ranges.
+    Returns (low, high) string pairs; low is inclusive, high exclusive,
+    and None means unbounded. PostgreSQL compares UUIDs byte by byte, and
+    SQLite compares the lower-case text form in the same order, so these
+    ranges are disjoint and cover every user_id.
+    """
+    if partitions < 1:
+        raise ValueError("partitions must be at least 1")
+    step = (1 << 128) // partitions
+    bounds = [str(uuid.UUID(int=i * step)) for i in range(1, partitions)]
+    lows = [None] + bounds
+    highs = bounds + [None]
+    return list(zip(lows, highs))
+
+
+def _scan_partition(backend, index, low, high, batch_size, out):
+    """Worker: streams one user_id range and puts row batches on `out`."""
+    try:
+        connection = backend.connect()
+        cursor = backend.cursor(connection, name=f"partition_scan_{index}", itersize=batch_size)
+        where = []
+        if low is not None:
+            where.append(("user_id", ">=", low))
+        if high is not None:
+            where.append(("user_id", "<", high))
+        query, params, _ = build_select(where=where, order_by="user_id",
+                                        placeholder=backend.placeholder)
+        cursor.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            out.put((index, _ROWS, rows))
+        cursor.close()
+        connection.close()
+        out.put((index, _DONE, None))
+    except Exception as e:
+        out.put((index, _ERROR, repr(e)))
+
+
+def parallel_scan(partitions=None, ordered=False, batch_size=1000, queue_depth=8,
+                  backend=None):
+    """
+    Generator that scans user_data with one worker process per user_id range
+    and yields (user_id, name, email, age) tuples from a single iterator.
+
+    ordered=False yields batches as soon as any worker produces them.
+    ordered=True yields rows sorted by user_id: partitions are drained in
+    key order while later workers keep prefetching up to queue_depth batches.
+    Each worker opens its own connection through `backend` (see backends).
+    """
+    backend = get_backend(backend)
+    partitions = partitions or multiprocessing.cpu_count()
+    ctx = multiprocessing.get_context()
+    ranges = uuid_ranges(partitions)
+
+    if ordered:
+        queues = [ctx.Queue(maxsize=queue_depth) for _ in ranges]
+    else:
+        shared = ctx.Queue(maxsize=queue_depth * partitions)
+        queues = [shared] * partitions
+
+    workers = [
+        ctx.Process(target=_scan_partition, args=(backend, i, low, high, batch_size, queues[i]),
+                    daemon=True)
+        for i, (low, high) in enumerate(ranges)
+    ]
+    for worker in workers:
+        worker.start()
+
+    try:
+        if ordered:
+            for q in queues:
+                yield from _drain(q, 1)
+        else:
+            yield from _drain(queues[0], partitions)
+    finally:
+        for worker in workers:
+            if worker.is_alive():
+                worker.terminate()
+            worker.join()
+
+
+def _drain(q, producers):
+    """Yields rows from `q` until `producers` workers have reported done."""
+    remaining = producers
+    while remaining:
+        index, kind, payload = q.get()
+        if kind == _ROWS:
+            yield from payload
+        elif kind == _DONE:
+            remaining -= 1
+        else:
+            raise RuntimeError(f"Partition {index} failed: {payload}")
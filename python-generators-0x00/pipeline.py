@@ -0,0 +1,289 @@
+#!/usr/bin/python3
+"""Composable source -> map -> filter -> batch -> sink pipelines.
+
+Every stage runs on its own thread and hands items to the next stage
+through a bounded queue, so a slow stage pushes back on the ones before it
+instead of letting memory grow. A map or filter stage can also fan out to
+a thread or process pool. Pipeline.stats() reports each stage's
+throughput, busy time and the depth of the queue feeding it: the stage
+whose input queue stays full is the bottleneck.
+
+    stream_users = __import__('0-stream_users').stream_users
+    stats = (Pipeline(stream_users(server_side=True), name="stream_users")
+             .filter(lambda user: user["age"] > 25, name="age>25")
+             .batch(100)
+             .sink(print))
+
+Functions given to a process-pool stage must be picklable (module-level).
+"""
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+DEFAULT_QUEUE_SIZE = 64
+
+_END = object()
+_DROP = object()
+
+
+class _Failure:
+    """Carries an exception raised by a stage down to the consumer."""
+
+    def __init__(self, error):
+        self.error = error
+
+
+class StageStats:
+    """Counters for one stage; read them through Pipeline.stats()."""
+
+    def __init__(self, name, inbox):
+        self.name = name
+        self.inbox = inbox
+        self.items_in = 0
+        self.items_out = 0
+        self.busy = 0.0
+        self.max_queue_depth = 0
+        self.started = None
+        self.finished = None
+
+    def as_dict(self):
+        end = self.finished or time.perf_counter()
+        elapsed = end - self.started if self.started else 0.0
+        depth = self.inbox.qsize() if self.inbox is not None else 0
+        return {
+            "stage": self.name,
+            "items_in": self.items_in,
+            "items_out": self.items_out,
+            "items_per_sec": self.items_out / elapsed if elapsed > 0 else 0.0,
+            "busy_seconds": self.busy,
+            "utilization": self.busy / elapsed if elapsed > 0 else 0.0,
+            "queue_depth": depth,
+            "max_queue_depth": max(self.max_queue_depth, depth),
+        }
+
+
+class _Stage:
+    def __init__(self, name, kind, func=None, size=None, workers=0, executor="thread",
+                 queue_size=DEFAULT_QUEUE_SIZE):
+        if executor not in ("thread", "process"):
+            raise ValueError(f"Unknown executor: {executor}")
+        self.name = name
+        self.kind = kind
+        self.func = func
+        self.size = size
+        self.workers = workers
+        self.executor = executor
+        self.queue_size = queue_size
+
+
+def _timed(func, item):
+    # Module-level so pooled stages can run in a process pool
+    start = time.perf_counter()
+    return func(item), time.perf_counter() - start
+
+
+class Pipeline:
+    """A chain of stages fed by one source iterable."""
+
+    def __init__(self, source, name="source", queue_size=DEFAULT_QUEUE_SIZE):
+        self.source = source
+        self.source_name = name
+        self.queue_size = queue_size
+        self.stages = []
+        self._stats = []
+        self._sink_stats = None
+
+    def map(self, func, name=None, workers=0, executor="thread", queue_size=None):
+        """Apply func to every item. workers > 0 runs it in a pool, keeping order."""
+        self.stages.append(_Stage(name or getattr(func, "__name__", "map"), "map", func,
+                                  workers=workers, executor=executor,
+                                  queue_size=queue_size or self.queue_size))
+        return self
+
+    def filter(self, predicate, name=None, workers=0, executor="thread", queue_size=None):
+        """Keep only items for which predicate(item) is true."""
+        self.stages.append(_Stage(name or getattr(predicate, "__name__", "filter"), "filter",
+                                  predicate, workers=workers, executor=executor,
+                                  queue_size=queue_size or self.queue_size))
+        return self
+
+    def batch(self, size, name=None, queue_size=None):
+        """Group items into lists of up to size items."""
+        self.stages.append(_Stage(name or f"batch({size})", "batch", size=size,
+                                  queue_size=queue_size or self.queue_size))
+        return self
+
+    def sink(self, func, name="sink"):
+        """Run the pipeline, calling func on every output item. Returns stats()."""
+        stats = self._sink_stats = StageStats(name, None)
+        stats.started = time.perf_counter()
+        for item in self:
+            stats.items_in += 1
+            start = time.perf_counter()
+            func(item)
+            stats.busy += time.perf_counter() - start
+            stats.items_out += 1
+        stats.finished = time.perf_counter()
+        return self.stats()
+
+    def stats(self):
+        """Per-stage counters, in pipeline order."""
+        stats = self._stats + ([self._sink_stats] if self._sink_stats else [])
+        return [s.as_dict() for s in stats]
+
+    def __iter__(self):
+        stop = threading.Event()
+        source_out = queue.Queue(maxsize=self.queue_size)
+        source_stats = StageStats(self.source_name, None)
+        self._stats = [source_stats]
+        threads = [threading.Thread(target=self._run_source,
+                                    args=(source_stats, source_out, stop), daemon=True)]
+        inbox = source_out
+        for stage in self.stages:
+            outbox = queue.Queue(maxsize=stage.queue_size)
+            stats = StageStats(stage.name, inbox)
+            self._stats.append(stats)
+            threads.append(threading.Thread(target=self._run_stage,
+                                            args=(stage, stats, inbox, outbox, stop),
+                                            daemon=True))
+            inbox = outbox
+
+        for thread in threads:
+            thread.start()
+        try:
+            while True:
+                item = inbox.get()
+                if item is _END:
+                    break
+                if isinstance(item, _Failure):
+                    raise item.error
+                yield item
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+    @staticmethod
+    def _put(outbox, item, stop):
+        while not stop.is_set():
+            try:
+                outbox.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    @staticmethod
+    def _get(inbox, stats, stop):
+        stats.max_queue_depth = max(stats.max_queue_depth, inbox.qsize())
+        while not stop.is_set():
+            try:
+                return inbox.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _END
+
+    def _run_source(self, stats, outbox, stop):
+        stats.started = time.perf_counter()
+        try:
+            iterator = iter(self.source)
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    break
+                stats.busy += time.perf_counter() - start
+                stats.items_out += 1
+                if not self._put(outbox, item, stop):
+                    return
+        except Exception as e:
+            self._put(outbox, _Failure(e), stop)
+            return
+        finally:
+            stats.finished = time.perf_counter()
+        self._put(outbox, _END, stop)
+
+    def _run_stage(self, stage, stats, inbox, outbox, stop):
+        stats.started = time.perf_counter()
+        try:
+            if stage.kind == "batch":
+                self._run_batch(stage, stats, inbox, outbox, stop)
+            elif stage.workers:
+                self._run_pooled(stage, stats, inbox, outbox, stop)
+            else:
+                self._run_inline(stage, stats, inbox, outbox, stop)
+        except Exception as e:
+            self._put(outbox, _Failure(e), stop)
+        finally:
+            stats.finished = time.perf_counter()
+
+    def _emit(self, stats, outbox, stop, result):
+        if result is _DROP:
+            return True
+        stats.items_out += 1
+        return self._put(outbox, result, stop)
+
+    def _run_inline(self, stage, stats, inbox, outbox, stop):
+        while True:
+            item = self._get(inbox, stats, stop)
+            if item is _END or isinstance(item, _Failure):
+                self._put(outbox, item, stop)
+                return
+            stats.items_in += 1
+            start = time.perf_counter()
+            if stage.kind == "map":
+                result = stage.func(item)
+            else:
+                result = item if stage.func(item) else _DROP
+            stats.busy += time.perf_counter() - start
+            if not self._emit(stats, outbox, stop, result):
+                return
+
+    def _run_pooled(self, stage, stats, inbox, outbox, stop):
+        pool_class = ThreadPoolExecutor if stage.executor == "thread" else ProcessPoolExecutor
+        in_flight = deque()
+        with pool_class(max_workers=stage.workers) as pool:
+            while True:
+                item = self._get(inbox, stats, stop)
+                if item is _END or isinstance(item, _Failure):
+                    break
+                stats.items_in += 1
+                in_flight.append((item, pool.submit(_timed, stage.func, item)))
+                # Bound the work in flight; emit results in input order
+                while len(in_flight) >= stage.workers * 2:
+                    if not self._drain_one(stage, stats, outbox, stop, in_flight):
+                        return
+            while in_flight:
+                if not self._drain_one(stage, stats, outbox, stop, in_flight):
+                    return
+        self._put(outbox, item, stop)
+
+    def _drain_one(self, stage, stats, outbox, stop, in_flight):
+        item, future = in_flight.popleft()
+        value, seconds = future.result()
+        if stage.kind == "map":
+            result = value
+        else:
+            result = item if value else _DROP
+        # Busy time is per worker, so utilization stays comparable to 1.0
+        stats.busy += seconds / stage.workers
+        return self._emit(stats, outbox, stop, result)
+
+    def _run_batch(self, stage, stats, inbox, outbox, stop):
+        batch = []
+        while True:
+            item = self._get(inbox, stats, stop)
+            if item is _END or isinstance(item, _Failure):
+                if batch and not self._emit(stats, outbox, stop, batch):
+                    return
+                self._put(outbox, item, stop)
+                return
+            stats.items_in += 1
+            batch.append(item)
+            if len(batch) >= stage.size:
+                if not self._emit(stats, outbox, stop, batch):
+                    return
+                batch = []
@@ -0,0 +1,62 @@
+#!/usr/bin/python3
+"""Background prefetching for the batch and page generators."""
+import queue
+import threading
+
+_END = object()
+
+
+def prefetch(iterable, depth=2):
+    """
+    Generator that pulls items from `iterable` on a background thread.
+    While the caller works on item k, item k+1 (up to `depth` items ahead)
+    is already being fetched. The bounded queue stops the producer from
+    running further ahead than that. Exceptions raised by the producer
+    are re-raised in the caller.
+    """
+    if depth < 1:
+        raise ValueError("depth must be at least 1")
+
+    buffer = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def put(item):
+        # Give up if the consumer went away instead of blocking forever
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    return
+        except Exception as e:
+            put((_END, e))
+            return
+        finally:
+            # Release the source's cursor/connection if the consumer stopped
+            # early, on this thread: the one that opened them (SQLite objects
+            # may only be used by the thread that created them)
+            close = getattr(iterable, "close", None)
+            if close is not None:
+                close()
+        put((_END, None))
+
+    worker = threading.Thread(target=produce, daemon=True)
+    worker.start()
+    try:
+        while True:
+            item, error = buffer.get()
+            if error is not None:
+                raise error
+            if item is _END:
+                break
+            yield item
+    finally:
+        stop.set()
+        worker.join()
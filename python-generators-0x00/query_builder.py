@@ -0,0 +1,83 @@
+#!/usr/bin/python3
+"""Compile declarative column lists and filters into parameterized SELECTs."""
+
+USER_TABLE = "user_data"
+USER_COLUMNS = ("user_id", "name", "email", "age")
+
+# Shared by seed.create_table and the SQLite backend
+USER_DATA_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS user_data (
+        user_id UUID PRIMARY KEY,
+        name VARCHAR(255) NOT NULL,
+        email VARCHAR(255) NOT NULL,
+        age DECIMAL NOT NULL
+    );
+"""
+
+# Secondary indexes for the access paths the generators use: age filters
+# and aggregates, and lookups by email. Created after bulk loads.
+USER_DATA_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_user_data_age ON user_data (age);",
+    "CREATE INDEX IF NOT EXISTS idx_user_data_email ON user_data (email);",
+)
+
+# Comparison operators a filter may use, mapped to their SQL spelling
+OPERATORS = {
+    "=": "=",
+    "!=": "<>",
+    "<": "<",
+    "<=": "<=",
+    ">": ">",
+    ">=": ">=",
+    "like": "LIKE",
+    "in": "IN",
+}
+
+
+def _check_column(column):
+    if column not in USER_COLUMNS:
+        raise ValueError(f"Unknown column: {column!r}")
+    return column
+
+
+def build_where(where=None, placeholder="%s"):
+    """
+    Turns [(column, op, value), ...] into a WHERE clause and its params.
+    Filters are ANDed together; "in" takes a sequence of values.
+    Returns ("", []) when there is nothing to filter on.
+    """
+    clauses, params = [], []
+    for column, op, value in where or ():
+        sql_op = OPERATORS.get(str(op).lower())
+        if sql_op is None:
+            raise ValueError(f"Unsupported operator: {op!r}")
+        _check_column(column)
+        if sql_op == "IN":
+            values = list(value)
+            if not values:
+                # Nothing can match an empty IN list
+                clauses.append("1 = 0")
+                continue
+            marks = ", ".join([placeholder] * len(values))
+            clauses.append(f"{column} IN ({marks})")
+            params.extend(values)
+        else:
+            clauses.append(f"{column} {sql_op} {placeholder}")
+            params.append(value)
+    if not clauses:
+        return "", []
+    return " WHERE " + " AND ".join(clauses), params
+
+
+def build_select(columns=None, where=None, order_by=None, placeholder="%s"):
+    """
+    Builds "SELECT <columns> FROM user_data [WHERE ...] [ORDER BY ...]".
+    Column names are checked against USER_COLUMNS, values are always bound
+    as parameters. Returns (query, params, columns).
+    """
+    columns = tuple(_check_column(c) for c in columns) if columns else USER_COLUMNS
+    where_sql, params = build_where(where, placeholder)
+    query = f"SELECT {', '.join(columns)} FROM {USER_TABLE}{where_sql}"
+    if order_by:
+        query += f" ORDER BY {_check_column(order_by)}"
+    return query + ";", params, columns
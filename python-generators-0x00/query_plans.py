@@ -0,0 +1,98 @@
+#!/usr/bin/python3
+"""EXPLAIN every query the user_data generators run.
+
+Usage: python3 query_plans.py [sqlite_path]   (default: PostgreSQL)
+
+Each plan is printed under the generator that issues the query. Queries
+marked as indexed should never fall back to a full table scan; if one
+does (a dropped index, a type change, stale statistics) it is flagged, so
+plan regressions show up before they show up as slow scans.
+"""
+import sys
+
+from backends import SQLiteBackend, get_backend
+from query_builder import build_select
+
+# Lowest possible UUID, used as the keyset / partition bound parameter
+_FIRST_UUID = "00000000-0000-0000-0000-000000000000"
+
+
+def _is_full_scan(line):
+    """True for a plan line that reads the whole table (PostgreSQL or SQLite)."""
+    line = line.strip()
+    if "Seq Scan on user_data" in line:
+        return True
+    # SQLite: "SCAN user_data" (or "SCAN TABLE user_data"), unless via an index
+    return line.startswith("SCAN") and "user_data" in line and "USING" not in line
+
+
+def generator_queries(placeholder="%s"):
+    """[(generator, query, params, indexed), ...] for every generator query."""
+    p = placeholder
+    stream_query, stream_params, _ = build_select(placeholder=p)
+    batch_query, batch_params, _ = build_select(where=[("age", ">", 25)], placeholder=p)
+    return [
+        ("0-stream_users.stream_users", stream_query, stream_params, False),
+        ("1-batch_processing.batch_processing", batch_query, batch_params, False),
+        ("2-lazy_paginate.paginate_users (offset, compatibility)",
+         f"SELECT * FROM user_data LIMIT {p} OFFSET {p};", [100, 1000], False),
+        ("2-lazy_paginate.keyset_pagination (first page)",
+         f"SELECT * FROM user_data ORDER BY user_id LIMIT {p};", [100], True),
+        ("2-lazy_paginate.keyset_pagination (next page)",
+         f"SELECT * FROM user_data WHERE user_id > {p} ORDER BY user_id LIMIT {p};",
+         [_FIRST_UUID, 100], True),
+        ("4-stream_ages.stream_user_ages", "SELECT age FROM user_data;", [], False),
+        ("4-stream_ages.aggregate_ages (summary)",
+         "SELECT COUNT(age), AVG(age), MIN(age), MAX(age) FROM user_data;", [], False),
+        ("4-stream_ages.aggregate_ages (histogram)",
+         f"SELECT FLOOR(age / {p}) * {p} AS bucket, COUNT(*) FROM user_data "
+         f"GROUP BY bucket ORDER BY bucket;", [10, 10], False),
+        ("partitioned_scan.parallel_scan",
+         f"SELECT user_id, name, email, age FROM user_data "
+         f"WHERE user_id >= {p} AND user_id < {p} ORDER BY user_id;",
+         [_FIRST_UUID, "80000000-0000-0000-0000-000000000000"], True),
+    ]
+
+
+def explain_report(backend=None):
+    """
+    Returns {generator: {"plan": [lines], "full_scan": bool, "regression": bool}}.
+    A query the backend cannot plan gets {"error": message} instead.
+    """
+    backend = get_backend(backend)
+    conn = backend.connect()
+    report = {}
+    try:
+        for name, query, params, indexed in generator_queries(backend.placeholder):
+            try:
+                plan = backend.explain(conn, query, params)
+            except Exception as e:
+                conn.rollback()
+                report[name] = {"error": str(e)}
+                continue
+            full_scan = any(_is_full_scan(line) for line in plan)
+            report[name] = {"plan": plan, "full_scan": full_scan,
+                            "regression": indexed and full_scan}
+    finally:
+        conn.close()
+    return report
+
+
+def print_report(report):
+    for name, entry in report.items():
+        print(f"== {name}")
+        if "error" in entry:
+            print(f"   could not explain: {entry['error']}")
+            continue
+        for line in entry["plan"]:
+            print(f"   {line}")
+        if entry["regression"]:
+            print("   !! expected an index scan, got a full table scan")
+    regressions = [name for name, entry in report.items() if entry.get("regression")]
+    print(f"{len(report)} queries explained, {len(regressions)} plan regressions")
+    return regressions
+
+
+if __name__ == "__main__":
+    backend = SQLiteBackend(sys.argv[1]) if len(sys.argv) > 1 else None
+    sys.exit(1 if print_report(explain_report(backend)) else 0)
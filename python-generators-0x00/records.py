@@ -0,0 +1,65 @@
+#!/usr/bin/python3
+"""Compact alternatives to one dict per user_data row."""
+from collections import namedtuple
+
+from query_builder import USER_COLUMNS
+
+# Plain tuple with attribute access: user.age as well as user[3]
+UserTuple = namedtuple("UserTuple", USER_COLUMNS)
+
+
+class UserRow:
+    """One user_data row stored in __slots__ instead of a per-row dict.
+
+    Supports attribute access (user.age) and, so existing consumers keep
+    working, key access (user["age"]). Columns that were not selected are None.
+    """
+    __slots__ = USER_COLUMNS
+
+    def __init__(self, user_id=None, name=None, email=None, age=None):
+        self.user_id = user_id
+        self.name = name
+        self.email = email
+        self.age = age
+
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __eq__(self, other):
+        if not isinstance(other, UserRow):
+            return NotImplemented
+        return self.as_tuple() == other.as_tuple()
+
+    def __repr__(self):
+        return (f"UserRow(user_id={self.user_id!r}, name={self.name!r}, "
+                f"email={self.email!r}, age={self.age!r})")
+
+    def as_tuple(self):
+        return tuple(getattr(self, c) for c in self.__slots__)
+
+    def as_dict(self):
+        return dict(zip(self.__slots__, self.as_tuple()))
+
+
+ROW_TYPES = ("dict", "slots", "tuple")
+
+
+def row_factory(columns, row_type="dict"):
+    """
+    Returns a function turning one cursor row (values in `columns` order)
+    into a dict, a UserRow ("slots") or a UserTuple ("tuple").
+    """
+    if row_type == "dict":
+        return lambda r: dict(zip(columns, r))
+    if row_type == "slots":
+        if tuple(columns) == USER_COLUMNS:
+            return lambda r: UserRow(*r)
+        return lambda r: UserRow(**dict(zip(columns, r)))
+    if row_type == "tuple":
+        if tuple(columns) == USER_COLUMNS:
+            return UserTuple._make
+        missing = {c: None for c in USER_COLUMNS}
+        return lambda r: UserTuple(**{**missing, **dict(zip(columns, r))})
+    raise ValueError(f"Unknown row type: {row_type}")
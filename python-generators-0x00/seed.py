@@ -1,31 +1,20 @@
-import os
 import csv
-import psycopg2
+import hashlib
+import os
+import time
+import uuid
 from psycopg2 import sql
-from psycopg2.extras import RealDictCursor
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
-
-# Database connection info from .env
-DB_NAME = os.getenv("PG_DB", "alx_prodev")
-DB_USER = os.getenv("PG_USER")
-DB_PASSWORD = os.getenv("PG_PASSWORD")
-DB_HOST = os.getenv("PG_HOST", "localhost")
-DB_PORT = os.getenv("PG_PORT", "5432")
+from psycopg2.extras import RealDictCursor, execute_values
+import db_pool
+from db_pool import DB_NAME
+from load_progress import LoadProgress
+from parallel_csv import parallel_csv_rows
+from query_builder import USER_DATA_INDEXES, USER_DATA_SCHEMA
 
 def connect_db():
     """Connect to the PostgreSQL server (admin connection)."""
     try:
-        conn = psycopg2.connect(
-            dbname="postgres",  # default admin db
-            user=DB_USER,
-            password=DB_PASSWORD,
-            host=DB_HOST,
-            port=DB_PORT
-        )
-        return conn
+        return db_pool.connect("postgres")  # default admin db
     except Exception as e:
         print(f"Error connecting to PostgreSQL: {e}")
         return None
@@ -44,45 +33,178 @@ def create_database(connection):
 def connect_to_prodev():
     """Connect directly to ALX_prodev database."""
     try:
-        conn = psycopg2.connect(
-            dbname=DB_NAME,
-            user=DB_USER,
-            password=DB_PASSWORD,
-            host=DB_HOST,
-            port=DB_PORT
-        )
-        return conn
+        return db_pool.connect(DB_NAME)
     except Exception as e:
         print(f"Error connecting to ALX_prodev: {e}")
         return None
 
-def create_table(connection):
-    """Create table user_data if it doesn’t exist."""
-    cursor = connection.cursor()
-    create_table_query = """
-    CREATE TABLE IF NOT EXISTS user_data (
-        user_id UUID PRIMARY KEY,
-        name VARCHAR(255) NOT NULL,
-        email VARCHAR(255) NOT NULL,
-        age DECIMAL NOT NULL
-    );
+def create_table(connection, indexes=True, integer_age=False):
+    """Create table user_data if it doesn’t exist.
+
+    indexes=True also creates the secondary indexes (see create_indexes);
+    pass False before a large bulk load and call create_indexes after it.
+    integer_age=True converts age to INTEGER (see convert_age_to_integer).
     """
-    cursor.execute(create_table_query)
+    cursor = connection.cursor()
+    cursor.execute(USER_DATA_SCHEMA)
     connection.commit()
     print("Table user_data created successfully")
     cursor.close()
+    if integer_age:
+        convert_age_to_integer(connection)
+    if indexes:
+        create_indexes(connection)
 
-def insert_data(connection, csv_file):
-    """Insert data into user_data table from CSV file."""
+def create_indexes(connection):
+    """Create the secondary indexes on user_data (age, email) if missing."""
     cursor = connection.cursor()
-    with open(csv_file, 'r', encoding='utf-8') as file:
-        reader = csv.DictReader(file)
-        for row in reader:
-            cursor.execute("""
-                INSERT INTO user_data (user_id, name, email, age)
-                VALUES (%s, %s, %s, %s)
-                ON CONFLICT (user_id) DO NOTHING;
-            """, (row['user_id'], row['name'], row['email'], row['age']))
+    for statement in USER_DATA_INDEXES:
+        cursor.execute(statement)
+    connection.commit()
+    print("Indexes on user_data created successfully")
+    cursor.close()
+
+def convert_age_to_integer(connection):
+    """Change user_data.age from DECIMAL to INTEGER, rounding existing values.
+
+    Integer comparisons and index entries are smaller and cheaper than
+    numeric ones. Does nothing if age is already an integer.
+    """
+    cursor = connection.cursor()
+    cursor.execute("""
+        SELECT data_type FROM information_schema.columns
+        WHERE table_name = 'user_data' AND column_name = 'age';
+    """)
+    row = cursor.fetchone()
+    if row and row[0] != 'integer':
+        cursor.execute("ALTER TABLE user_data ALTER COLUMN age TYPE INTEGER USING round(age);")
+        connection.commit()
+        print("Column user_data.age converted to INTEGER")
+    cursor.close()
+
+def analyze_table(connection):
+    """Refresh planner statistics for user_data (run after bulk loads)."""
+    cursor = connection.cursor()
+    cursor.execute("ANALYZE user_data;")
+    connection.commit()
+    cursor.close()
+
+def user_id_for_email(email):
+    """Deterministic user_id for a CSV row without one: the MD5 of the
+    lower-cased email as a UUID, the same as PostgreSQL's md5(lower(email))::uuid.
+    Re-running a load therefore hits ON CONFLICT instead of adding users again.
+    """
+    return str(uuid.UUID(hashlib.md5(email.lower().encode('utf-8')).hexdigest()))
+
+def parse_user_row(row):
+    """Turn one CSV row into insert values (see user_id_for_email for missing ids)."""
+    return (row.get('user_id') or user_id_for_email(row['email']), row['name'], row['email'], row['age'])
+
+def insert_data(connection, csv_file, workers=0, ordered=False, batch_size=1000, progress=None):
+    """Insert data into user_data table from CSV file.
+
+    With workers > 0 the CSV is parsed by that many processes (see
+    parallel_csv) and the rows are written here in batches of batch_size.
+    progress is a LoadProgress; by default one prints a status line every
+    10 seconds.
+    """
+    if progress is None:
+        progress = LoadProgress(total_bytes=os.path.getsize(csv_file))
+    cursor = connection.cursor()
+    if workers:
+        insert_query = """
+            INSERT INTO user_data (user_id, name, email, age)
+            VALUES %s
+            ON CONFLICT (user_id) DO NOTHING;
+        """
+        stats = {}
+
+        def write(batch):
+            start = time.perf_counter()
+            execute_values(cursor, insert_query, batch)
+            progress.bytes = stats["bytes"]
+            progress.rejected = stats["rejected"]
+            progress.add_batch(len(batch), time.perf_counter() - start)
+
+        batch = []
+        for row in parallel_csv_rows(csv_file, parse_user_row, workers, ordered, stats=stats):
+            batch.append(row)
+            if len(batch) == batch_size:
+                write(batch)
+                batch.clear()
+        if batch:
+            write(batch)
+    else:
+        with open(csv_file, 'r', encoding='utf-8') as file:
+            reader = csv.DictReader(file)
+            pending, start = 0, time.perf_counter()
+            for row in reader:
+                cursor.execute("""
+                    INSERT INTO user_data (user_id, name, email, age)
+                    VALUES (%s, %s, %s, %s)
+                    ON CONFLICT (user_id) DO NOTHING;
+                """, parse_user_row(row))
+                pending += 1
+                # Rows go one by one; report them in groups of batch_size
+                if pending == batch_size:
+                    progress.bytes = file.buffer.tell()
+                    progress.add_batch(pending, time.perf_counter() - start)
+                    pending, start = 0, time.perf_counter()
+            if pending:
+                progress.add_batch(pending, time.perf_counter() - start)
     connection.commit()
+    progress.finish()
     print("Data inserted successfully")
     cursor.close()
+
+
+def bulk_insert_data(connection, csv_file, analyze=True):
+    """Bulk load user_data from CSV with COPY into a staging table, then merge.
+
+    The file is streamed to the server by COPY, so it is never read into
+    memory up front. Rows whose user_id already exists are skipped, the same
+    as insert_data; a missing user_id column is derived from the email the
+    same way too (see user_id_for_email), so re-running a load adds nothing.
+    analyze=True runs ANALYZE afterwards so the planner sees the new rows.
+    """
+    cursor = connection.cursor()
+    start = time.perf_counter()
+    with open(csv_file, 'r', encoding='utf-8') as file:
+        # Consume the header ourselves so COPY only sees data lines
+        columns = next(csv.reader([file.readline()]))
+        unknown = set(columns) - {'user_id', 'name', 'email', 'age'}
+        if unknown:
+            raise ValueError(f"Unexpected CSV columns: {sorted(unknown)}")
+
+        cursor.execute("""
+            CREATE TEMP TABLE user_data_staging (
+                user_id UUID,
+                name VARCHAR(255) NOT NULL,
+                email VARCHAR(255) NOT NULL,
+                age DECIMAL NOT NULL
+            ) ON COMMIT DROP;
+        """)
+        copy_query = sql.SQL("COPY user_data_staging ({}) FROM STDIN WITH (FORMAT csv)").format(
+            sql.SQL(', ').join(map(sql.Identifier, columns))
+        )
+        # Quote with the real cursor: connection may be a db_pool.PooledConnection proxy
+        cursor.copy_expert(copy_query.as_string(cursor), file)
+        staged = cursor.rowcount
+
+    cursor.execute("""
+        INSERT INTO user_data (user_id, name, email, age)
+        SELECT COALESCE(user_id, md5(lower(email))::uuid), name, email, age
+        FROM user_data_staging
+        ON CONFLICT (user_id) DO NOTHING;
+    """)
+    inserted = cursor.rowcount
+    connection.commit()
+    cursor.close()
+    if analyze:
+        analyze_table(connection)
+
+    elapsed = time.perf_counter() - start
+    rate = staged / elapsed if elapsed > 0 else 0
+    print(f"Bulk loaded {staged} rows ({inserted} new) in {elapsed:.2f}s "
+          f"- {rate:,.0f} rows/sec")
+    return inserted
@@ -0,0 +1,211 @@
+#!/usr/bin/python3
+"""One-pass, bounded-memory statistics over the user_data streams.
+
+KLLSketch estimates quantiles, HyperLogLog counts distinct values and
+SpaceSaving tracks the most frequent ones. Every sketch has merge(), so
+partitions scanned separately (see partitioned_scan) can be combined.
+"""
+import hashlib
+import math
+import random
+
+stream_users = __import__('0-stream_users').stream_users
+
+
+class KLLSketch:
+    """
+    Quantile sketch of Karnin, Lang and Liberty. Keeps O(k) items; rank
+    error is roughly 1.7 / k of the stream length with high probability.
+    """
+
+    def __init__(self, k=200, c=2 / 3, seed=None):
+        self.k = k
+        self.c = c
+        self.count = 0
+        self._compactors = []
+        self._random = random.Random(seed)
+        self._grow()
+
+    def _grow(self):
+        self._compactors.append([])
+        self._max_size = sum(self._capacity(h) for h in range(len(self._compactors)))
+
+    def _capacity(self, height):
+        depth = len(self._compactors) - height - 1
+        return int(math.ceil(self.c ** depth * self.k)) + 1
+
+    def _size(self):
+        return sum(len(items) for items in self._compactors)
+
+    def _compress(self):
+        for height, items in enumerate(self._compactors):
+            if len(items) >= self._capacity(height):
+                if height + 1 >= len(self._compactors):
+                    self._grow()
+                # Sort, keep every other item at double weight one level up
+                items.sort()
+                leftover = [items.pop()] if len(items) % 2 else []
+                offset = self._random.randint(0, 1)
+                self._compactors[height + 1].extend(items[offset::2])
+                self._compactors[height] = leftover
+                if self._size() < self._max_size:
+                    break
+
+    def update(self, value):
+        self._compactors[0].append(value)
+        self.count += 1
+        if self._size() >= self._max_size:
+            self._compress()
+
+    def merge(self, other):
+        while len(self._compactors) < len(other._compactors):
+            self._grow()
+        for height, items in enumerate(other._compactors):
+            self._compactors[height].extend(items)
+        self.count += other.count
+        while self._size() >= self._max_size:
+            self._compress()
+        return self
+
+    def quantile(self, q):
+        """Estimated value at quantile q (0 <= q <= 1); None if empty."""
+        weighted = sorted(
+            (value, 1 << height)
+            for height, items in enumerate(self._compactors)
+            for value in items
+        )
+        if not weighted:
+            return None
+        target = q * sum(weight for _, weight in weighted)
+        seen = 0
+        for value, weight in weighted:
+            seen += weight
+            if seen >= target:
+                return value
+        return weighted[-1][0]
+
+
+class HyperLogLog:
+    """Distinct-count estimate in 2**p one-byte registers (~1.04 / sqrt(2**p) error)."""
+
+    def __init__(self, p=14):
+        if not 4 <= p <= 18:
+            raise ValueError("p must be between 4 and 18")
+        self.p = p
+        self.registers = bytearray(1 << p)
+
+    @staticmethod
+    def _hash(value):
+        digest = hashlib.blake2b(str(value).encode(), digest_size=8).digest()
+        return int.from_bytes(digest, "big")
+
+    def update(self, value):
+        x = self._hash(value)
+        index = x >> (64 - self.p)
+        rest = x & ((1 << (64 - self.p)) - 1)
+        rank = (64 - self.p) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        if other.p != self.p:
+            raise ValueError("Cannot merge HyperLogLogs of different precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def count(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Small-range correction: linear counting
+            estimate = m * math.log(m / zeros)
+        return round(estimate)
+
+
+class SpaceSaving:
+    """
+    Top-k heavy hitters of Metwally et al. Tracks at most `capacity`
+    items; each reported count overestimates the truth by at most `error`.
+    """
+
+    def __init__(self, capacity=100):
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+
+    def _floor(self):
+        # Largest count an untracked item could have had
+        if len(self.counts) < self.capacity:
+            return 0
+        return min(self.counts.values())
+
+    def update(self, item, weight=1):
+        if item in self.counts:
+            self.counts[item] += weight
+            return
+        if len(self.counts) < self.capacity:
+            self.counts[item] = weight
+            self.errors[item] = 0
+            return
+        victim = min(self.counts, key=self.counts.get)
+        floor = self.counts.pop(victim)
+        del self.errors[victim]
+        self.counts[item] = floor + weight
+        self.errors[item] = floor
+
+    def merge(self, other):
+        floor_self, floor_other = self._floor(), other._floor()
+        counts, errors = {}, {}
+        for item in set(self.counts) | set(other.counts):
+            counts[item] = (self.counts.get(item, floor_self)
+                            + other.counts.get(item, floor_other))
+            errors[item] = (self.errors.get(item, floor_self)
+                            + other.errors.get(item, floor_other))
+        keep = sorted(counts, key=counts.get, reverse=True)[:self.capacity]
+        self.counts = {item: counts[item] for item in keep}
+        self.errors = {item: errors[item] for item in keep}
+        return self
+
+    def top(self, n=10):
+        """[(item, count, max_overestimate), ...] for the n largest counts."""
+        ranked = sorted(self.counts.items(), key=lambda kv: kv[1], reverse=True)[:n]
+        return [(item, count, self.errors[item]) for item, count in ranked]
+
+
+class UserStats:
+    """Age quantiles, distinct email domains and top names in one pass."""
+
+    def __init__(self, k=200, p=14, capacity=100):
+        self.ages = KLLSketch(k)
+        self.domains = HyperLogLog(p)
+        self.names = SpaceSaving(capacity)
+
+    def update(self, name, email, age):
+        self.ages.update(float(age))
+        self.domains.update(email.rpartition("@")[2].lower())
+        self.names.update(name)
+
+    def merge(self, other):
+        self.ages.merge(other.ages)
+        self.domains.merge(other.domains)
+        self.names.merge(other.names)
+        return self
+
+    def summary(self, quantiles=(0.5, 0.95, 0.99), top_k=10):
+        return {
+            "count": self.ages.count,
+            "age_quantiles": {q: self.ages.quantile(q) for q in quantiles},
+            "distinct_email_domains": self.domains.count(),
+            "top_names": self.names.top(top_k),
+        }
+
+
+def user_statistics(quantiles=(0.5, 0.95, 0.99), top_k=10, backend=None):
+    """Scans user_data once and returns UserStats.summary() for it."""
+    stats = UserStats(capacity=max(100, top_k * 10))
+    for user in stream_users(server_side=True, columns=("name", "email", "age"),
+                             row_type="tuple", backend=backend):
+        stats.update(user.name, user.email, user.age)
+    return stats.summary(quantiles, top_k)
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Tests for the user_data generators, run against a temporary SQLite copy of
+the user_data.csv fixture (see backends.SQLiteBackend), and for the CSV
+loaders: seed's user_id derivation and insert_data's upsert counts.
+"""
+import csv
+import importlib.util
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+from backends import SQLiteBackend
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+FIXTURE = os.path.join(HERE, "user_data.csv")
+
+stream_users_module = __import__('0-stream_users')
+batch_module = __import__('1-batch_processing')
+paginate_module = __import__('2-lazy_paginate')
+ages_module = __import__('4-stream_ages')
+
+
+def load_insert_data():
+    """The repository-level insert_data.py, imported by path."""
+    if "insert_data" in sys.modules:
+        return sys.modules["insert_data"]
+    path = os.path.join(os.path.dirname(HERE), "insert_data.py")
+    spec = importlib.util.spec_from_file_location("insert_data", path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["insert_data"] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def fixture_rows():
+    with open(FIXTURE, newline='', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+
+class SQLiteTestCase(unittest.TestCase):
+    """Loads the CSV fixture into a fresh SQLite database per test class."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.mkdtemp()
+        cls.backend = SQLiteBackend(os.path.join(cls.tmpdir, "user_data.db"))
+        cls.backend.create_schema()
+        cls.rows = cls.backend.load_csv(FIXTURE)
+        cls.backend.create_indexes()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmpdir)
+
+    def all_ids(self):
+        conn = self.backend.connect()
+        try:
+            return [r[0] for r in conn.execute("SELECT user_id FROM user_data ORDER BY user_id")]
+        finally:
+            conn.close()
+
+
+class TestStreamUsers(SQLiteTestCase):
+    """stream_users and its resumable variant."""
+
+    def test_streams_every_row(self):
+        """Every fixture row comes back once, as a dict of all columns."""
+        users = list(stream_users_module.stream_users(backend=self.backend))
+        self.assertEqual(len(users), self.rows)
+        self.assertEqual(set(users[0]), {"user_id", "name", "email", "age"})
+
+    def test_pushes_down_columns_and_filters(self):
+        """columns and where are compiled into the query."""
+        users = list(stream_users_module.stream_users(
+            columns=("email", "age"), where=[("age", ">", 90)], backend=self.backend))
+        self.assertTrue(users)
+        self.assertTrue(all(set(u) == {"email", "age"} and u["age"] > 90 for u in users))
+
+    def test_resumes_from_checkpoint(self):
+        """A scan stopped part way resumes after the last checkpointed row."""
+        state = os.path.join(self.tmpdir, "stream.json")
+        first = []
+        for user in stream_users_module.stream_users_resumable(
+                state, checkpoint_every=100, backend=self.backend):
+            first.append(user["user_id"])
+            if len(first) == 250:
+                break
+        rest = [u["user_id"] for u in stream_users_module.stream_users_resumable(
+            state, checkpoint_every=100, backend=self.backend)]
+        # The checkpoint was saved at row 200, so rows 201-250 are read again
+        self.assertEqual(first[:200] + rest, self.all_ids())
+        self.assertFalse(os.path.exists(state))
+
+
+class TestBatches(SQLiteTestCase):
+    """stream_users_in_batches layouts."""
+
+    def test_batch_sizes(self):
+        """Full batches of batch_size and one short final batch."""
+        sizes = [len(b) for b in batch_module.stream_users_in_batches(
+            300, backend=self.backend)]
+        self.assertEqual(sum(sizes), self.rows)
+        self.assertTrue(all(size == 300 for size in sizes[:-1]))
+
+    def test_columnar_layout(self):
+        """layout="columns" yields one array per column."""
+        if batch_module.np is None:
+            self.skipTest("numpy is not installed")
+        batches = list(batch_module.stream_users_in_batches(
+            500, layout="columns", columns=("name", "age"), backend=self.backend))
+        self.assertEqual(set(batches[0]), {"name", "age"})
+        self.assertEqual(sum(len(b["age"]) for b in batches), self.rows)
+
+
+class TestPagination(SQLiteTestCase):
+    """Keyset pagination and its resumable forms."""
+
+    def test_lazy_pagination_walks_in_key_order(self):
+        """Pages cover every row once, in user_id order."""
+        ids = [u["user_id"] for page in paginate_module.lazy_pagination(
+            128, backend=self.backend) for u in page]
+        self.assertEqual(ids, self.all_ids())
+
+    def test_continuation_token(self):
+        """Passing a page's token back in continues with the next page."""
+        pages = paginate_module.keyset_pagination(100, backend=self.backend)
+        first, token = next(pages)
+        pages.close()
+        second, _ = next(paginate_module.keyset_pagination(
+            100, token=token, backend=self.backend))
+        self.assertEqual([u["user_id"] for u in first + second], self.all_ids()[:200])
+
+    def test_resumable_pagination(self):
+        """Only the page being processed at the crash is read again."""
+        state = os.path.join(self.tmpdir, "pages.json")
+        seen = []
+        for page in paginate_module.resumable_pagination(100, state, backend=self.backend):
+            seen.extend(u["user_id"] for u in page)
+            if len(seen) == 300:
+                break
+        for page in paginate_module.resumable_pagination(100, state, backend=self.backend):
+            seen.extend(u["user_id"] for u in page)
+        self.assertEqual(seen[:200] + seen[300:], self.all_ids())
+        self.assertFalse(os.path.exists(state))
+
+
+class TestAges(SQLiteTestCase):
+    """Age streaming and aggregates."""
+
+    def test_aggregate_matches_stream(self):
+        """The in-database summary agrees with consuming the generator."""
+        ages = [float(a) for a in ages_module.stream_user_ages(backend=self.backend)]
+        stats = ages_module.aggregate_ages(backend=self.backend)
+        self.assertEqual(stats["count"], len(ages))
+        self.assertAlmostEqual(stats["avg"], sum(ages) / len(ages))
+        self.assertEqual(stats["min"], min(ages))
+        self.assertEqual(stats["max"], max(ages))
+        self.assertEqual(sum(stats["histogram"].values()), len(ages))
+
+    def test_client_aggregate_matches_database(self):
+        """aggregate_ages_client returns the same summary."""
+        if ages_module.np is None:
+            self.skipTest("numpy is not installed")
+        expected = ages_module.aggregate_ages(backend=self.backend)
+        stats = ages_module.aggregate_ages_client(chunk_size=128, backend=self.backend)
+        self.assertEqual(stats["count"], expected["count"])
+        self.assertAlmostEqual(stats["avg"], expected["avg"])
+        self.assertEqual(stats["histogram"], expected["histogram"])
+
+
+class TestParallelScan(SQLiteTestCase):
+    """parallel_scan over user_id partitions."""
+
+    def test_ordered_scan(self):
+        """ordered=True yields every row sorted by user_id."""
+        from partitioned_scan import parallel_scan
+        ids = [row[0] for row in parallel_scan(
+            partitions=3, ordered=True, batch_size=64, backend=self.backend)]
+        self.assertEqual(ids, self.all_ids())
+
+    def test_unordered_scan(self):
+        """ordered=False yields the same rows in any order."""
+        from partitioned_scan import parallel_scan
+        ids = [row[0] for row in parallel_scan(
+            partitions=3, batch_size=64, backend=self.backend)]
+        self.assertEqual(sorted(ids), self.all_ids())
+
+
+class TestSeedUserIds(unittest.TestCase):
+    """seed.parse_user_row derives missing user_ids from the email."""
+
+    def test_missing_user_id_is_deterministic(self):
+        """The same email always maps to the same id, whatever its case."""
+        from seed import parse_user_row
+        row = {"name": "A", "email": "Ann@Example.com", "age": "30"}
+        self.assertEqual(parse_user_row(row)[0], parse_user_row(dict(row))[0])
+        self.assertEqual(parse_user_row(row)[0],
+                         parse_user_row(dict(row, email="ann@example.com"))[0])
+        self.assertNotEqual(parse_user_row(row)[0],
+                            parse_user_row(dict(row, email="bob@example.com"))[0])
+
+    def test_given_user_id_is_kept(self):
+        from seed import parse_user_row
+        row = {"user_id": "00000000-0000-0000-0000-000000000001",
+               "name": "A", "email": "a@example.com", "age": "30"}
+        self.assertEqual(parse_user_row(row)[0], row["user_id"])
+
+
+class TestUpsert(unittest.TestCase):
+    """insert_data.insert_from_generator(upsert=True) against users.db."""
+
+    def setUp(self):
+        self.insert_data = load_insert_data()
+        self.cwd = os.getcwd()
+        self.tmpdir = tempfile.mkdtemp()
+        os.chdir(self.tmpdir)  # insert_data works on ./users.db
+        with redirect_stdout(StringIO()):
+            self.insert_data.create_table()
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmpdir)
+
+    def write_csv(self, rows):
+        path = os.path.join(self.tmpdir, "users.csv")
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(["name", "email", "age"])
+            writer.writerows(rows)
+        return path
+
+    def load(self, csv_file, **kwargs):
+        with redirect_stdout(StringIO()):
+            return self.insert_data.insert_from_generator(
+                csv_file, batch_size=100, upsert=True,
+                progress=self.insert_data.LoadProgress(log=lambda line: None), **kwargs)
+
+    def test_fixture_reload_is_unchanged(self):
+        """Loading the same file twice writes nothing the second time."""
+        emails = {r["email"] for r in fixture_rows()}
+        first = self.load(FIXTURE)
+        self.assertEqual(first["inserted"], len(emails))
+        second = self.load(FIXTURE)
+        self.assertEqual(second, {"inserted": 0, "updated": 0,
+                                  "unchanged": len(fixture_rows())})
+
+    def test_changed_rows_are_updated(self):
+        """Changed rows are updated, new ones inserted and the rest left alone."""
+        self.load(self.write_csv([("Ann", "ann@example.com", 30),
+                                  ("Bob", "bob@example.com", 40)]))
+        counts = self.load(self.write_csv([("Ann", "ann@example.com", 31),
+                                           ("Bob", "bob@example.com", 40),
+                                           ("Cy", "cy@example.com", 50)]))
+        self.assertEqual(counts, {"inserted": 1, "updated": 1, "unchanged": 1})
+        conn = self.insert_data.sqlite3.connect("users.db")
+        try:
+            age = conn.execute("SELECT age FROM users WHERE email = 'ann@example.com'").fetchone()
+        finally:
+            conn.close()
+        self.assertEqual(age, (31,))
+
+
+if __name__ == "__main__":
+    unittest.main()